@@ -0,0 +1,22 @@
+"""
+Clock for tests of components that take their time from a clock function
+"""
+
+
+class FakeClock:
+    """
+    Clock that moves only when a test advances it, sleeps are recorded without waiting
+    """
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        """
+        Records a sleep without waiting
+        """
+        self.sleeps.append(seconds)
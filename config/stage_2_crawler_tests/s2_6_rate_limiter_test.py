@@ -0,0 +1,64 @@
+"""
+Tests for per-host rate limiting of scrapper requests
+"""
+import unittest
+
+import pytest
+
+from config.fake_clock import FakeClock
+from core_utils.rate_limiter import HostRateLimiter
+
+URL = 'https://journals.kantiana.ru/vestnik/'
+
+
+class HostRateLimiterTest(unittest.TestCase):
+    """
+    Tests for HostRateLimiter with a fake clock
+    """
+
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.limiter = HostRateLimiter(rate=1.0, burst=2, clock=self.clock, sleep=self.clock.sleep)
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_6_rate_limiter_checks
+    def test_burst_then_rate(self):
+        """
+        Ensure that `burst` requests go at once and the next ones are spread at `rate`
+        """
+        for _ in range(4):
+            self.limiter.acquire(URL)
+        self.assertEqual([1.0, 2.0], self.clock.sleeps)
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_6_rate_limiter_checks
+    def test_hosts_are_limited_separately(self):
+        """
+        Ensure that requests to another host do not wait for the first one
+        """
+        for _ in range(2):
+            self.limiter.acquire(URL)
+        self.limiter.acquire('https://example.com/')
+        self.assertEqual([], self.clock.sleeps)
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_6_rate_limiter_checks
+    def test_requests_after_pause_do_not_burst(self):
+        """
+        Ensure that requests made during a pause are spread at `rate` after it
+        """
+        self.limiter.pause(URL, 30)
+        for _ in range(6):
+            self.limiter.acquire(URL)
+        self.assertEqual([30.0, 30.0, 31.0, 32.0, 33.0, 34.0], self.clock.sleeps)
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_6_rate_limiter_checks
+    def test_rate_restored_after_pause(self):
+        """
+        Ensure that a request after the pause has passed does not wait
+        """
+        self.limiter.pause(URL, 30)
+        self.clock.now = 31.0
+        self.limiter.acquire(URL)
+        self.assertEqual([], self.clock.sleeps)
@@ -0,0 +1,126 @@
+"""
+Tests for the work queue shared by crawl worker processes
+"""
+import shutil
+import time
+import unittest
+
+import pytest
+
+from config.fake_clock import FakeClock
+from config.test_params import TEST_PATH
+from core_utils.work_queue import SQLiteWorkQueue
+
+
+class SQLiteWorkQueueTest(unittest.TestCase):
+    """
+    Tests for leases of SQLiteWorkQueue
+    """
+
+    def setUp(self) -> None:
+        TEST_PATH.mkdir(parents=True, exist_ok=True)
+        self.path = TEST_PATH / 'crawl_queue.sqlite'
+        self.clock = FakeClock(now=1000.0)
+        self.queue = SQLiteWorkQueue(self.path, visibility_timeout=300, max_attempts=2, clock=self.clock)
+        self.queue.put_many([(1, 'https://example.com/1'), (2, 'https://example.com/2')])
+
+    def tearDown(self) -> None:
+        self.queue.close()
+        shutil.rmtree(TEST_PATH)
+
+    def make_other_worker(self):
+        """
+        Opens the queue as another worker process would
+        """
+        other = SQLiteWorkQueue(self.path, visibility_timeout=300, max_attempts=2, clock=self.clock)
+        other.worker_id = 'other-host:1'
+        self.addCleanup(other.close)
+        return other
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_7_work_queue_checks
+    def test_leased_item_hidden_until_lease_expires(self):
+        """
+        Ensure that a leased item is not leased again before visibility_timeout has passed
+        """
+        other = self.make_other_worker()
+        self.assertEqual(1, self.queue.lease()[0])
+        self.assertEqual(2, other.lease()[0])
+        self.assertIsNone(other.lease())
+
+        self.clock.now += 301
+        self.assertEqual(1, other.lease()[0])
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_7_work_queue_checks
+    def test_expired_lease_cannot_be_completed(self):
+        """
+        Ensure that a worker whose lease has been taken over does not touch the item
+        """
+        other = self.make_other_worker()
+        self.queue.lease()
+        self.clock.now += 301
+        other.lease()
+
+        self.assertFalse(self.queue.extend(1))
+        self.queue.complete(1)
+        self.assertEqual(0, self.queue.get_counts()['done'])
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_7_work_queue_checks
+    def test_extended_lease_stays_hidden(self):
+        """
+        Ensure that an extended item is hidden for another visibility_timeout
+        """
+        other = self.make_other_worker()
+        self.queue.lease()
+        self.clock.now += 200
+        self.assertTrue(self.queue.extend(1))
+        self.clock.now += 200
+        self.assertEqual(2, other.lease()[0])
+        self.assertIsNone(other.lease())
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_7_work_queue_checks
+    def test_item_failed_after_max_attempts(self):
+        """
+        Ensure that an item whose leases have expired max_attempts times is marked as failed
+        """
+        for _ in range(2):
+            self.assertEqual(1, self.queue.lease()[0])
+            self.clock.now += 301
+        self.assertEqual(2, self.queue.lease()[0])
+        self.assertEqual(1, self.queue.get_counts()['failed'])
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_7_work_queue_checks
+    def test_item_with_new_url_is_pending_again(self):
+        """
+        Ensure that a done item given another url by a different crawl is scraped again,
+        while a done item with the same url is not
+        """
+        for _ in range(2):
+            self.queue.complete(self.queue.lease()[0])
+        self.queue.put_many([(1, 'https://example.com/1'), (2, 'https://example.com/other')])
+
+        self.assertFalse(self.queue.is_finished())
+        self.assertEqual((2, 'https://example.com/other'), self.queue.lease())
+        self.assertIsNone(self.queue.lease())
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_7_work_queue_checks
+    def test_lease_kept_while_item_is_processed(self):
+        """
+        Ensure that an item processed for longer than visibility_timeout is not leased by another worker
+        """
+        queue = SQLiteWorkQueue(self.path, visibility_timeout=0.3)
+        other = SQLiteWorkQueue(self.path, visibility_timeout=0.3)
+        other.worker_id = 'other-host:1'
+        self.addCleanup(queue.close)
+        self.addCleanup(other.close)
+
+        item_id, _ = queue.lease()
+        with queue.keep_leased(item_id):
+            time.sleep(0.9)
+            self.assertNotEqual(item_id, other.lease()[0])
+            self.assertIsNone(other.lease())
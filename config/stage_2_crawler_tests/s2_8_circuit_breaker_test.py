@@ -0,0 +1,95 @@
+"""
+Tests for the per-host circuit breaker of scrapper requests
+"""
+import unittest
+
+import pytest
+
+from config.fake_clock import FakeClock
+from core_utils.circuit_breaker import HostCircuitBreaker
+
+URL = 'https://journals.kantiana.ru/vestnik/'
+
+
+class HostCircuitBreakerTest(unittest.TestCase):
+    """
+    Tests for HostCircuitBreaker with a fake clock
+    """
+
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.breaker = HostCircuitBreaker(clock=self.clock)
+
+    def open_circuit(self):
+        """
+        Fails requests to the host until its circuit opens, returns the pause
+        """
+        pauses = [self.breaker.record(URL, False, self.breaker.start()) for _ in range(5)]
+        self.assertEqual([0.0] * 4, pauses[:-1])
+        return pauses[-1]
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_8_circuit_breaker_checks
+    def test_circuit_opens_on_failures(self):
+        """
+        Ensure that the circuit opens once min_requests requests have failed
+        """
+        self.assertEqual(30.0, self.open_circuit())
+        self.assertEqual(1, self.breaker.opened)
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_8_circuit_breaker_checks
+    def test_circuit_stays_closed_below_failure_ratio(self):
+        """
+        Ensure that occasional failures do not open the circuit
+        """
+        for success in (True, True, False, True, False, True, True):
+            self.assertEqual(0.0, self.breaker.record(URL, success, self.breaker.start()))
+        self.assertEqual(0, self.breaker.opened)
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_8_circuit_breaker_checks
+    def test_requests_started_before_closing_ignored(self):
+        """
+        Ensure that requests started while the circuit was open are not taken for the trial
+        """
+        started = self.breaker.start()
+        self.open_circuit()
+        self.clock.now = 31.0
+        self.assertEqual(0.0, self.breaker.record(URL, False, started))
+        self.assertEqual(1, self.breaker.opened)
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_8_circuit_breaker_checks
+    def test_failed_trial_doubles_cooldown(self):
+        """
+        Ensure that a failed trial request opens the circuit again for twice as long
+        """
+        self.open_circuit()
+        self.clock.now = 31.0
+        self.assertEqual(60.0, self.breaker.record(URL, False, self.breaker.start()))
+        self.clock.now = 92.0
+        self.assertEqual(120.0, self.breaker.record(URL, False, self.breaker.start()))
+        self.assertEqual(3, self.breaker.opened)
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_8_circuit_breaker_checks
+    def test_successful_trial_closes_circuit(self):
+        """
+        Ensure that a successful trial request closes the circuit and resets the cooldown
+        """
+        self.open_circuit()
+        self.clock.now = 31.0
+        self.assertEqual(60.0, self.breaker.record(URL, False, self.breaker.start()))
+        self.clock.now = 92.0
+        self.assertEqual(0.0, self.breaker.record(URL, True, self.breaker.start()))
+        self.assertEqual(30.0, self.open_circuit())
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_8_circuit_breaker_checks
+    def test_hosts_are_watched_separately(self):
+        """
+        Ensure that failures of one host do not open the circuit of another one
+        """
+        self.open_circuit()
+        self.assertEqual(0.0, self.breaker.record('https://example.com/', False, self.breaker.start()))
@@ -0,0 +1,67 @@
+"""
+Tests for re-parsing articles from the response archive
+"""
+import shutil
+import unittest
+
+import pytest
+import requests
+
+from config.test_params import TEST_PATH
+from constants import DOMAIN
+from core_utils.pdf_utils import StreamingDownloader
+from core_utils.response_archive import ArchiveClient, ResponseArchive
+from scrapper import HTMLParser, ScrapeOptions
+
+ARTICLE_URL = f'{DOMAIN}/vestnik/article/view/1'
+PDF_HREF = '/vestnik/article/download/1.pdf'
+ARTICLE_PAGE = (f'<html><body><h3 class="article__title">Title</h3>'
+                f'<a class="article-panel__item button-icon" href="{PDF_HREF}">PDF</a>'
+                f'</body></html>').encode('utf-8')
+
+
+class ArchiveClientTest(unittest.TestCase):
+    """
+    Tests for articles whose responses are missing in the archive
+    """
+
+    def setUp(self) -> None:
+        TEST_PATH.mkdir(parents=True, exist_ok=True)
+        self.archive = ResponseArchive(TEST_PATH / 'responses.warc.gz')
+        self.archive.append(ARTICLE_URL, 'text/html; charset=utf-8', ARTICLE_PAGE)
+        self.client = ArchiveClient(self.archive)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        shutil.rmtree(TEST_PATH)
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_9_response_archive_checks
+    def test_missing_pdf_download_fails_with_http_error(self):
+        """
+        Ensure that streaming a url missing in the archive fails as a 404 would
+        """
+        with self.assertRaises(requests.HTTPError):
+            StreamingDownloader(self.client).fetch(DOMAIN + PDF_HREF)
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_9_response_archive_checks
+    def test_article_with_missing_pdf_fails_with_http_error(self):
+        """
+        Ensure that an archived article page whose PDF is missing fails with the error reparsing skips
+        """
+        parser = HTMLParser(ARTICLE_URL, 1, self.client, ScrapeOptions(keep_pdf=False))
+        with self.assertRaises(requests.HTTPError):
+            parser.parse()
+        self.assertEqual({'served': 1, 'missing': 1}, self.client.get_stats())
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_2_9_response_archive_checks
+    def test_missing_article_page_fails_with_http_error(self):
+        """
+        Ensure that an article page missing in the archive fails with the error reparsing skips
+        """
+        parser = HTMLParser(f'{DOMAIN}/vestnik/article/view/2', 2, self.client)
+        with self.assertRaises(requests.HTTPError):
+            parser.parse()
+        self.assertEqual({'served': 0, 'missing': 1}, self.client.get_stats())
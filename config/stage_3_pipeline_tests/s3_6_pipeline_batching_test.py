@@ -0,0 +1,144 @@
+"""
+Tests for batched and streamed text processing
+"""
+from contextlib import contextmanager
+import io
+import re
+import unittest
+
+import pytest
+
+from pipeline import PipelineResources, TextProcessingPipeline, iter_text_chunks
+
+TEXTS = [
+    'Первая статья. В ней есть след-\nующий перенос!\n\nИ второй абзац...',
+    '«Вторая» статья: 2022 год, т. е. прошлый;\nконец.',
+    'Третья статья - короткая?',
+]
+
+
+class StubMystem:
+    """
+    Splits a text into word and non-word tokens the way Mystem does, without its binary
+    """
+
+    def __init__(self, non_word_pattern=r'\W+'):
+        self._pattern = re.compile(r'\w+|' + non_word_pattern)
+        self.calls = 0
+
+    def analyze(self, text):
+        """
+        Returns Mystem-like analysis of a text
+        """
+        self.calls += 1
+        tokens = []
+        for match in self._pattern.finditer(text):
+            token = match.group(0)
+            if token[0].isalnum() or token[0] == '_':
+                tokens.append({'text': token, 'analysis': [{'lex': token.lower(), 'gr': 'S,жен,неод=им,ед'}]})
+            else:
+                tokens.append({'text': token})
+        tokens.append({'text': '\n'})
+        return tokens
+
+
+class StubMystemPool:
+    """
+    Lends the same stub analyzer every time
+    """
+
+    def __init__(self, mystem):
+        self.mystem = mystem
+
+    @contextmanager
+    def checkout(self):
+        """
+        Lends the analyzer for the duration of a with-block
+        """
+        yield self.mystem
+
+
+class StubMorphCache:
+    """
+    Tags every word form as a noun
+    """
+
+    @staticmethod
+    def parse(word):
+        """
+        Returns pymorphy-like tags and normal form of a word
+        """
+        return 'NOUN,inan,femn sing,nomn', word.lower()
+
+
+def make_pipeline(non_word_pattern=r'\W+'):
+    """
+    Creates a pipeline analyzing texts with stubs
+    """
+    resources = PipelineResources(mystem_pool=StubMystemPool(StubMystem(non_word_pattern)),
+                                  morph_cache=StubMorphCache())
+    return TextProcessingPipeline(corpus_manager=None, resources=resources)
+
+
+def render(pipeline, raw_texts):
+    """
+    Returns the single-tagged rendering of every text analyzed at once
+    """
+    # pylint: disable=protected-access
+    return [pipeline._tag(None, analysis).get_single_tagged()
+            for analysis in pipeline._analyze_raw_texts(raw_texts)]
+
+
+class PipelineBatchingTest(unittest.TestCase):
+    """
+    Tests that batched and streamed processing gives the same tokens as processing texts one by one
+    """
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_3_6_pipeline_batching_checks
+    def test_batched_analysis_equals_separate_analysis(self):
+        """
+        Ensure that texts analyzed in one Mystem request are split back correctly
+        """
+        pipeline = make_pipeline()
+        expected = [render(pipeline, [text])[0] for text in TEXTS]
+        pipeline.resources.mystem_pool.mystem.calls = 0
+        self.assertEqual(expected, render(pipeline, TEXTS))
+        self.assertEqual(1, pipeline.resources.mystem_pool.mystem.calls, 'texts must be sent in one request')
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_3_6_pipeline_batching_checks
+    def test_batched_analysis_with_separator_split_into_tokens(self):
+        """
+        Ensure that the split works when Mystem breaks the separator into several tokens
+        """
+        pipeline = make_pipeline(non_word_pattern=r'\W')
+        expected = [render(pipeline, [text])[0] for text in TEXTS]
+        pipeline.resources.mystem_pool.mystem.calls = 0
+        self.assertEqual(expected, render(pipeline, TEXTS))
+        self.assertEqual(1, pipeline.resources.mystem_pool.mystem.calls, 'texts must be sent in one request')
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_3_6_pipeline_batching_checks
+    def test_text_chunks_keep_whole_text(self):
+        """
+        Ensure that chunks add up to the text and never cut a hyphenated word
+        """
+        text = '\n\n'.join(TEXTS * 20)
+        chunks = list(iter_text_chunks(io.StringIO(text), 40))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(text, ''.join(chunks))
+        for chunk in chunks[:-1]:
+            self.assertFalse(chunk.rstrip('\n').endswith('-'))
+
+    @pytest.mark.mark10
+    @pytest.mark.stage_3_6_pipeline_batching_checks
+    def test_streamed_analysis_equals_whole_analysis(self):
+        """
+        Ensure that a text analyzed chunk by chunk gives the same tokens as the whole text
+        """
+        pipeline = make_pipeline()
+        text = '\n\n'.join(TEXTS * 20)
+        renderings = [render(pipeline, [chunk])[0] for chunk in iter_text_chunks(io.StringIO(text), 40)]
+        streamed = [rendering for rendering in renderings if rendering]
+        self.assertEqual(render(pipeline, [text])[0], ' '.join(streamed))
@@ -6,6 +6,11 @@ from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).parent
 ASSETS_PATH = PROJECT_ROOT / 'tmp' / 'articles'
+# kept next to the dataset, so that it survives the dataset being recreated by the scrapper
+HTTP_CACHE_PATH = PROJECT_ROOT / 'tmp' / 'http_cache'
+CRAWL_JOURNAL_PATH = PROJECT_ROOT / 'tmp' / 'crawl_journal.jsonl'
+CRAWL_QUEUE_PATH = PROJECT_ROOT / 'tmp' / 'crawl_queue.sqlite'
+RESPONSE_ARCHIVE_PATH = PROJECT_ROOT / 'tmp' / 'responses.warc.gz'
 CRAWLER_CONFIG_PATH = PROJECT_ROOT / 'scrapper_config.json'
 DOMAIN = "https://journals.kantiana.ru"
 HEADERS = {'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
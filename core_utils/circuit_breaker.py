@@ -0,0 +1,93 @@
+"""
+Per-host circuit breaker of scrapper requests
+"""
+
+from collections import deque
+from dataclasses import dataclass
+import threading
+import time
+from urllib.parse import urlparse
+
+DEFAULT_WINDOW = 20
+DEFAULT_MIN_REQUESTS = 5
+DEFAULT_FAILURE_RATIO = 0.5
+DEFAULT_COOLDOWN = 30.0
+MAX_COOLDOWN = 600.0
+
+
+@dataclass
+class CircuitPolicy:
+    """
+    When the circuit of a host opens and for how long
+    """
+
+    # number of the last requests to a host the failure ratio is computed over
+    window: int = DEFAULT_WINDOW
+    # fewer requests tell nothing about the host yet
+    min_requests: int = DEFAULT_MIN_REQUESTS
+    failure_ratio: float = DEFAULT_FAILURE_RATIO
+    # seconds the host is paused for the first time, doubled after every failed trial request
+    cooldown: float = DEFAULT_COOLDOWN
+
+
+class _HostCircuit:
+    """
+    Recent outcomes of requests to a host and the state of its circuit
+    """
+
+    def __init__(self, window: int, cooldown: float):
+        self.outcomes = deque(maxlen=window)
+        self.cooldown = cooldown
+        # requests started before the circuit has closed again tell nothing about the host's recovery
+        self.closes_at = None
+
+
+class HostCircuitBreaker:
+    """
+    Watches the share of failed requests to every host among its last `window` requests of the policy.
+    Once it reaches failure_ratio, the circuit of the host opens and traffic to it is paused for cooldown seconds.
+    The first request finished after the pause is a trial: its failure opens the circuit again for twice as long,
+    its success closes the circuit.
+    """
+
+    def __init__(self, policy: CircuitPolicy = None, clock=time.monotonic):
+        self.policy = policy or CircuitPolicy()
+        self.opened = 0
+        self._clock = clock
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Returns the start time of a request to be passed to record
+        """
+        return self._clock()
+
+    def record(self, url: str, success: bool, started: float):
+        """
+        Records an outcome of a request started at `started`,
+        returns for how many seconds the url's host must be paused, 0 if its circuit stays closed
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            circuit = self._circuits.setdefault(host, _HostCircuit(self.policy.window, self.policy.cooldown))
+
+            if circuit.closes_at is not None:
+                if started < circuit.closes_at:
+                    return 0.0
+                circuit.closes_at = None
+                if success:
+                    circuit.cooldown = self.policy.cooldown
+                    return 0.0
+                circuit.cooldown = min(circuit.cooldown * 2, MAX_COOLDOWN)
+            else:
+                circuit.outcomes.append(success)
+                failures = circuit.outcomes.count(False)
+                if (len(circuit.outcomes) < self.policy.min_requests
+                        or failures < self.policy.failure_ratio * len(circuit.outcomes)):
+                    return 0.0
+
+            circuit.outcomes.clear()
+            circuit.closes_at = self._clock() + circuit.cooldown
+            self.opened += 1
+            return circuit.cooldown
@@ -0,0 +1,110 @@
+"""
+Checkpoint journal of a crawl for resuming it after a failure
+"""
+
+import json
+import threading
+
+
+class CrawlJournal:
+    """
+    Append-only journal of crawl progress, one JSON event per line:
+        - config: seed urls, number of articles and whether pagination is followed, as the crawl was started
+        - seed: a seed page has been processed and these article urls (and listing pages to follow) were found on it
+        - article: an article has been parsed and saved
+        - finished: the crawl has completed
+    A line is written at once, so a crash may lose at most the event being written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.config = None
+        self.seed_urls = {}
+        self.page_links = {}
+        self.completed_articles = {}
+        self.finished = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def can_resume(self, seed_urls, max_articles: int, follow_pagination: bool = False):
+        """
+        Checks whether there is an unfinished crawl with the same configuration
+        """
+        return (not self.finished and self.config is not None
+                and self.config == _make_config(seed_urls, max_articles, follow_pagination))
+
+    def start(self, seed_urls, max_articles: int, follow_pagination: bool = False):
+        """
+        Drops previous progress and starts journaling a new crawl
+        """
+        self.config = _make_config(seed_urls, max_articles, follow_pagination)
+        self.seed_urls = {}
+        self.page_links = {}
+        self.completed_articles = {}
+        self.finished = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps({'event': 'config', **self.config}, ensure_ascii=False) + '\n')
+
+    def record_seed(self, seed_url: str, article_urls, page_links=None):
+        """
+        Remembers article urls found on a seed page and links of the page a frontier crawl follows
+        """
+        self.seed_urls[seed_url] = list(article_urls)
+        event = {'event': 'seed', 'url': seed_url, 'article_urls': list(article_urls)}
+        if page_links is not None:
+            self.page_links[seed_url] = event['page_links'] = list(page_links)
+        self._append(event)
+
+    def record_article(self, article_id: int, article_url: str):
+        """
+        Remembers that an article has been saved
+        """
+        self.completed_articles[article_id] = article_url
+        self._append({'event': 'article', 'id': article_id, 'url': article_url})
+
+    def record_finished(self):
+        """
+        Marks the crawl as completed, the next crawl starts from scratch
+        """
+        self.finished = True
+        self._append({'event': 'finished'})
+
+    def _append(self, event):
+        line = json.dumps(event, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(line)
+                file.flush()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+
+        with open(self.path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # the last line may be cut off by a crash
+                    continue
+                self._apply(event)
+
+    def _apply(self, event):
+        kind = event.get('event')
+        if kind == 'config':
+            # journals written before pagination could be followed belong to seed-only crawls
+            self.config = _make_config(event['seed_urls'], event['max_articles'],
+                                       event.get('follow_pagination', False))
+        elif kind == 'seed':
+            self.seed_urls[event['url']] = event['article_urls']
+            if 'page_links' in event:
+                self.page_links[event['url']] = event['page_links']
+        elif kind == 'article':
+            self.completed_articles[event['id']] = event['url']
+        elif kind == 'finished':
+            self.finished = True
+
+
+def _make_config(seed_urls, max_articles: int, follow_pagination: bool):
+    return {'seed_urls': list(seed_urls), 'max_articles': max_articles, 'follow_pagination': follow_pagination}
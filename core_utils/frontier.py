@@ -0,0 +1,133 @@
+"""
+Breadth-first crawl frontier with deduplication of canonical URLs
+"""
+
+from collections import deque
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+# query parameters switching pages of a listing
+PAGINATION_PARAMETER = re.compile(r'^(page|PAGEN_\d+)$')
+# query parameters that do not change the content of a page
+TRACKING_PARAMETER = re.compile(r'^(utm_\w+|fbclid|gclid|yclid)$')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url: str, base_url: str = None):
+    """
+    Brings a url to a single form: absolute, lower-case scheme and host, no default port,
+    no fragment and tracking parameters, sorted query
+    """
+    if base_url is not None:
+        url = urljoin(base_url, url)
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if not TRACKING_PARAMETER.match(key))
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+
+class URLSet:
+    """
+    Set of urls keeping an 8-byte digest of every canonical url instead of the url itself
+    """
+
+    def __init__(self):
+        self._digests = set()
+
+    @staticmethod
+    def _digest(url):
+        return hashlib.blake2b(canonicalize_url(url).encode('utf-8'), digest_size=8).digest()
+
+    def add(self, url: str):
+        """
+        Adds a url, returns False if it has been added before in any form
+        """
+        digest = self._digest(url)
+        if digest in self._digests:
+            return False
+        self._digests.add(digest)
+        return True
+
+    def __contains__(self, url):
+        return self._digest(url) in self._digests
+
+    def __len__(self):
+        return len(self._digests)
+
+
+def get_listing_pattern(seed_urls):
+    """
+    Builds a pattern of listing page paths from the seed urls,
+    numbers in their paths stand for any number, so that /vestnik/4827/ matches all issues.
+    Numbered pages of the sections a seed is in are issues too,
+    so that an archive seed /vestnik/archive/ leads to /vestnik/4827/.
+    """
+    paths = set()
+    for url in seed_urls:
+        path = urlsplit(url).path
+        paths.add(_generalize_path(path))
+        segments = [segment for segment in path.split('/') if segment]
+        for depth in range(1, len(segments)):
+            paths.add(_generalize_path('/' + '/'.join(segments[:depth]) + '/') + r'\d+/')
+    return re.compile('^(' + '|'.join(sorted(paths)) + ')$')
+
+
+def _generalize_path(path):
+    return re.sub(r'\d+', r'\\d+', re.escape(path))
+
+
+class CrawlFrontier:
+    """
+    Queue of listing pages (issues, archive pages and their pagination) visited breadth-first.
+    Only pages on the seed hosts whose path looks like a seed path are queued,
+    every page is queued once whatever form its url takes.
+    """
+
+    def __init__(self, seed_urls):
+        self._hosts = {urlsplit(canonicalize_url(url)).netloc for url in seed_urls}
+        self._pattern = get_listing_pattern(seed_urls)
+        self._seen = URLSet()
+        self._queue = deque()
+        self.depth = 0
+        for url in seed_urls:
+            self._push(canonicalize_url(url), 0)
+
+    def __len__(self):
+        return len(self._queue)
+
+    def pop_level(self, limit: int = None):
+        """
+        Takes pages of the nearest depth, at most limit of them
+        """
+        if not self._queue:
+            return []
+        self.depth = self._queue[0][1]
+        level = []
+        while self._queue and self._queue[0][1] == self.depth and (limit is None or len(level) < limit):
+            level.append(self._queue.popleft()[0])
+        return level
+
+    def add_links(self, page_url: str, hrefs):
+        """
+        Queues listing pages linked from a page one level deeper than it
+        """
+        for href in hrefs:
+            url = canonicalize_url(href, page_url)
+            if self._is_listing_page(url):
+                self._push(url, self.depth + 1)
+
+    def _is_listing_page(self, url):
+        parts = urlsplit(url)
+        return (parts.netloc in self._hosts and bool(self._pattern.match(parts.path))
+                and all(PAGINATION_PARAMETER.match(key) for key, _ in parse_qsl(parts.query)))
+
+    def _push(self, url, depth):
+        if self._seen.add(url):
+            self._queue.append((url, depth))
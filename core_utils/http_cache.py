@@ -0,0 +1,129 @@
+"""
+On-disk cache of HTTP responses revalidated with conditional requests
+"""
+
+import hashlib
+import json
+from pathlib import Path
+import shutil
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# response headers kept along with a cached body
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+class HTTPCache:
+    """
+    Stores response bodies keyed by URL together with their ETag and Last-Modified.
+    A stored response is reused when the server confirms with 304 Not Modified that it is still valid.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.revalidated = 0
+        self.stored = 0
+
+    def get_validators(self, url: str):
+        """
+        Returns headers for a conditional request for a cached url, empty if nothing is cached
+        """
+        meta = self._load_meta(url)
+        if meta is None:
+            return {}
+
+        validators = {}
+        if meta['headers'].get('ETag'):
+            validators['If-None-Match'] = meta['headers']['ETag']
+        if meta['headers'].get('Last-Modified'):
+            validators['If-Modified-Since'] = meta['headers']['Last-Modified']
+        return validators
+
+    def build_response(self, url: str):
+        """
+        Returns a cached response for a url that the server has answered with 304
+        """
+        meta = self._load_meta(url)
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.encoding = meta['encoding']
+        # requests keeps an already read body in a protected attribute
+        response._content = self._body_path(url).read_bytes()  # pylint: disable=protected-access
+        self.revalidated += 1
+        return response
+
+    def load_body(self, url: str):
+        """
+        Returns a cached body for a url that the server has answered with 304
+        """
+        self.revalidated += 1
+        return self._body_path(url).read_bytes()
+
+    def copy_body(self, url: str, path):
+        """
+        Copies a cached body to a file for a url that the server has answered with 304
+        """
+        shutil.copyfile(self._body_path(url), path)
+        self.revalidated += 1
+
+    def store(self, url: str, response):
+        """
+        Stores a read response if it can be revalidated later,
+        the requested url is the key even if the response has been redirected
+        """
+        self.store_body(url, response, response.content)
+
+    def store_body(self, url: str, response, body: bytes):
+        """
+        Stores a body of a streamed response that has been read into memory
+        """
+        if not self._is_cacheable(response):
+            return
+        self._body_path(url).write_bytes(body)
+        self._save_meta(url, response)
+
+    def store_file(self, url: str, response, path):
+        """
+        Stores a streamed response whose body has been written to a file
+        """
+        if not self._is_cacheable(response):
+            return
+        shutil.copyfile(path, self._body_path(url))
+        self._save_meta(url, response)
+
+    @staticmethod
+    def _is_cacheable(response):
+        return response.status_code == 200 and any(response.headers.get(header)
+                                                   for header in ('ETag', 'Last-Modified'))
+
+    def _save_meta(self, url, response):
+        meta = {
+            'url': url,
+            'encoding': response.encoding,
+            'headers': {header: response.headers[header]
+                        for header in STORED_HEADERS if header in response.headers}
+        }
+        with open(self._meta_path(url), 'w', encoding='utf-8') as file:
+            json.dump(meta, file, indent=4, ensure_ascii=False)
+        self.stored += 1
+
+    def _load_meta(self, url):
+        meta_path = self._meta_path(url)
+        if not meta_path.exists() or not self._body_path(url).exists():
+            return None
+        with open(meta_path, encoding='utf-8') as file:
+            return json.load(file)
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _body_path(self, url):
+        return self.directory / f'{self._key(url)}.body'
+
+    def _meta_path(self, url):
+        return self.directory / f'{self._key(url)}.json'
@@ -0,0 +1,188 @@
+"""
+HTTP client shared by the scrapper components
+"""
+
+from dataclasses import dataclass, field
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from constants import HEADERS
+from core_utils.circuit_breaker import HostCircuitBreaker
+from core_utils.http_cache import HTTPCache
+from core_utils.rate_limiter import HostRateLimiter
+from core_utils.response_archive import ResponseArchive
+
+DEFAULT_POOL_SIZE = 10
+# seconds to connect and to wait for the response, unless a request sets its own timeout
+DEFAULT_TIMEOUT = (10, 30)
+# how many times a request is repeated after the site has asked to slow down
+MAX_THROTTLED_ATTEMPTS = 3
+# how many times a request is repeated after a connection error, a timeout or a server error
+MAX_RETRIES = 3
+RETRY_STATUS_CODES = (500, 502, 504)
+BACKOFF_BASE = 1.0
+MAX_BACKOFF = 30.0
+
+_DEFAULT_CLIENT = None
+
+
+def create_session(headers: dict = None, pool_size: int = DEFAULT_POOL_SIZE):
+    """
+    Creates a requests session keeping up to pool_size open connections per host
+    """
+    session = requests.Session()
+    session.headers.update(HEADERS if headers is None else headers)
+
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_default_client():
+    """
+    Returns the client shared by all components that were not given their own one
+    """
+    global _DEFAULT_CLIENT  # pylint: disable=global-statement
+    if _DEFAULT_CLIENT is None:
+        _DEFAULT_CLIENT = HTTPClient()
+    return _DEFAULT_CLIENT
+
+
+@dataclass
+class HostPolicy:
+    """
+    How requests to every host are paced and how their failures are handled
+    """
+
+    rate_limiter: HostRateLimiter = field(default_factory=HostRateLimiter)
+    # pauses a host failing too often
+    circuit_breaker: HostCircuitBreaker = field(default_factory=HostCircuitBreaker)
+    max_retries: int = MAX_RETRIES
+
+
+class HTTPClient:
+    """
+    Sends every request of the scrapper through one connection-pooled session,
+    so that connections to the journal site are reused with keep-alive.
+    Requests are paced by the per-host rate limiter of the policy.
+    Transient failures are retried with jittered exponential backoff,
+    a host failing too often is paused by the circuit breaker of the policy.
+    If a cache is given, responses stored before are revalidated instead of being downloaded again.
+    If an archive is given, every page received is appended to it for re-parsing offline.
+    """
+
+    def __init__(self, session: requests.Session = None, policy: HostPolicy = None,
+                 cache: HTTPCache = None, archive: ResponseArchive = None):
+        self.session = session or create_session()
+        self.policy = policy or HostPolicy()
+        self.cache = cache
+        self.archive = archive
+        self._counters = {'requests': 0, 'retries': 0, 'timeouts': 0, 'connection_errors': 0, 'server_errors': 0}
+        self._counters_lock = threading.Lock()
+
+    def get(self, url: str, **kwargs):
+        """
+        Sends a GET request, a cached response is returned if the server has not changed it.
+        Streamed responses are neither cached nor archived here, their readers handle it themselves.
+        """
+        if kwargs.get('stream'):
+            return self._send(url, **kwargs)
+
+        if self.cache is None:
+            response = self._send(url, **kwargs)
+        else:
+            headers = {**(kwargs.pop('headers', None) or {}), **self.cache.get_validators(url)}
+            response = self._send(url, headers=headers, **kwargs)
+            if response.status_code == 304:
+                response = self.cache.build_response(url)
+            else:
+                self.cache.store(url, response)
+
+        if self.archive is not None and response.status_code == 200:
+            self.archive.append(url, response.headers.get('Content-Type'), response.content)
+        return response
+
+    def get_stats(self):
+        """
+        Returns counters of requests, retries and failures
+        """
+        with self._counters_lock:
+            stats = dict(self._counters)
+        stats['throttled'] = self.policy.rate_limiter.throttled_responses
+        stats['circuit_opened'] = self.policy.circuit_breaker.opened
+        if self.cache is not None:
+            stats['revalidated'] = self.cache.revalidated
+            stats['cached'] = self.cache.stored
+        return stats
+
+    def _send(self, url: str, **kwargs):
+        """
+        Sends a GET request, repeating it after a pause if the site answers with 429 or 503
+        and after a backoff on connection errors, timeouts and server errors
+        """
+        kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+        throttled = 0
+        failures = 0
+        while True:
+            self.policy.rate_limiter.acquire(url)
+            started = self.policy.circuit_breaker.start()
+            self._count('requests')
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                self._record(url, False, started,
+                             'timeouts' if isinstance(error, requests.Timeout) else 'connection_errors')
+                failures += 1
+                if failures > self.policy.max_retries:
+                    raise
+                self._back_off(failures)
+                continue
+
+            self._record(url, response.status_code < 500, started,
+                         'server_errors' if response.status_code >= 500 else None)
+            if self.policy.rate_limiter.observe(response):
+                throttled += 1
+                if throttled == MAX_THROTTLED_ATTEMPTS:
+                    return response
+            elif response.status_code in RETRY_STATUS_CODES and failures < self.policy.max_retries:
+                failures += 1
+                self._back_off(failures)
+            else:
+                return response
+            response.close()
+
+    def _record(self, url, success, started, counter):
+        if counter is not None:
+            self._count(counter)
+        pause = self.policy.circuit_breaker.record(url, success, started)
+        if pause:
+            self.policy.rate_limiter.pause(url, pause)
+
+    def _back_off(self, failures):
+        """
+        Sleeps a random time up to an exponentially growing limit,
+        so that clients that have failed together do not retry together
+        """
+        self._count('retries')
+        time.sleep(random.uniform(0, min(MAX_BACKOFF, BACKOFF_BASE * 2 ** (failures - 1))))
+
+    def _count(self, counter):
+        with self._counters_lock:
+            self._counters[counter] += 1
+
+    def close(self):
+        """
+        Closes all pooled connections
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,105 @@
+"""
+Manifest of processed articles for incremental pipeline runs
+"""
+
+import hashlib
+from importlib import metadata
+import json
+
+from core_utils.article import ArtifactType
+
+MANIFEST_SUFFIX = '_manifest.json'
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def get_manifest_path(corpus_path):
+    """
+    Returns the path of a corpus manifest, it is kept next to the corpus folder
+    so that stage checks and dataset validation only ever see articles inside the folder
+    """
+    return corpus_path.parent / f'{corpus_path.name}{MANIFEST_SUFFIX}'
+
+
+def get_analyzer_versions():
+    """
+    Returns versions of the libraries whose output ends up in the artifacts
+    """
+    versions = {}
+    for package in ('pymystem3', 'pymorphy2', 'pymorphy2-dicts-ru'):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def hash_file(path):
+    """
+    Returns sha256 of a file content
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ProcessingManifest:
+    """
+    Remembers a hash of every processed raw text together with analyzer versions.
+    An article is up to date if neither its raw text nor the analyzers have changed
+    and all of its artifacts are in place.
+    """
+
+    def __init__(self, path, analyzer_versions: dict = None):
+        self.path = path
+        self.analyzer_versions = analyzer_versions or get_analyzer_versions()
+        self._hashes = {}
+        self._current_hashes = {}
+        self._load()
+
+    def is_up_to_date(self, article):
+        """
+        Checks whether an article can be skipped
+        """
+        article_key = str(article.article_id)
+        current_hash = hash_file(article.get_raw_text_path())
+        self._current_hashes[article_key] = current_hash
+
+        if self._hashes.get(article_key) != current_hash:
+            return False
+
+        kinds = (ArtifactType.cleaned, ArtifactType.single_tagged, ArtifactType.multiple_tagged)
+        return all(article.get_file_path(kind).exists() for kind in kinds)
+
+    def record(self, article):
+        """
+        Marks an article as processed with its current raw text
+        """
+        article_key = str(article.article_id)
+        current_hash = self._current_hashes.pop(article_key, None)
+        self._hashes[article_key] = current_hash or hash_file(article.get_raw_text_path())
+
+    def save(self):
+        """
+        Writes the manifest, a temporary file keeps the previous one intact on failure
+        """
+        content = {
+            'analyzers': self.analyzer_versions,
+            'articles': self._hashes
+        }
+        temporary_path = self.path.with_suffix('.tmp')
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump(content, file, indent=4, ensure_ascii=False)
+        temporary_path.replace(self.path)
+
+    def _load(self):
+        if not self.path.exists():
+            return
+
+        with open(self.path, encoding='utf-8') as file:
+            content = json.load(file)
+
+        # other analyzer versions may tag differently, every article has to be processed again
+        if content.get('analyzers') == self.analyzer_versions:
+            self._hashes = content.get('articles', {})
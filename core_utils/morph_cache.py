@@ -0,0 +1,100 @@
+"""
+Process-wide pymorphy2 analyzer with a cache of parsed word forms
+"""
+
+from collections import OrderedDict
+import threading
+
+import pymorphy2
+
+DEFAULT_CACHE_SIZE = 100_000
+
+_ANALYZER = None
+_PARSE_CACHE = None
+_INSTANCE_LOCK = threading.Lock()
+
+
+def get_morph_analyzer():
+    """
+    Returns the MorphAnalyzer shared by the whole process,
+    dictionaries are loaded only on the first call
+    """
+    global _ANALYZER  # pylint: disable=global-statement
+    with _INSTANCE_LOCK:
+        if _ANALYZER is None:
+            _ANALYZER = pymorphy2.MorphAnalyzer()
+    return _ANALYZER
+
+
+def get_parse_cache():
+    """
+    Returns the parse cache shared by the whole process
+    """
+    global _PARSE_CACHE  # pylint: disable=global-statement
+    analyzer = get_morph_analyzer()
+    with _INSTANCE_LOCK:
+        if _PARSE_CACHE is None:
+            _PARSE_CACHE = MorphParseCache(analyzer)
+    return _PARSE_CACHE
+
+
+class MorphParseCache:
+    """
+    Bounded LRU cache of word -> (tag, normal_form) for the most probable parse.
+    The least recently used form is evicted once maxsize is reached.
+    """
+
+    def __init__(self, analyzer, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.analyzer = analyzer
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._storage = OrderedDict()
+        self._lock = threading.Lock()
+
+    def parse(self, word: str):
+        """
+        Returns a tag and a normal form of the most probable parse of a word
+        """
+        with self._lock:
+            if word in self._storage:
+                self.hits += 1
+                self._storage.move_to_end(word)
+                return self._storage[word]
+            self.misses += 1
+
+        best_parse = self.analyzer.parse(word)[0]
+        result = (best_parse.tag, best_parse.normal_form)
+
+        with self._lock:
+            self._storage[word] = result
+            if len(self._storage) > self.maxsize:
+                self._storage.popitem(last=False)
+                self.evictions += 1
+
+        return result
+
+    def clear(self):
+        """
+        Drops every cached form and resets the counters
+        """
+        with self._lock:
+            self._storage.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def get_stats(self):
+        """
+        Returns cache counters
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._storage),
+                'maxsize': self.maxsize
+            }
+
+    def __len__(self):
+        return len(self._storage)
@@ -0,0 +1,125 @@
+"""
+Persistent cache of Mystem analysis results
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+
+from core_utils.manifest import get_analyzer_versions
+
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+
+class MystemResultCache:
+    """
+    Sqlite-backed cache mapping a hash of a normalized paragraph to Mystem analysis JSON.
+    Once the stored analyses exceed max_bytes, the least recently used ones are evicted.
+    Writes are collected in one transaction until commit() is called.
+    """
+
+    def __init__(self, path, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+        # analysis of the same text may change with another Mystem wrapper release
+        self._key_prefix = json.dumps(get_analyzer_versions(), sort_keys=True)
+        self._connection = sqlite3.connect(str(path), timeout=30)
+        # several pipeline worker processes may share one cache file
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        # a crash may lose the last transactions, which are only a cache, but never corrupts the file
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS analyses ('
+                                 'key TEXT PRIMARY KEY, '
+                                 'analysis TEXT NOT NULL, '
+                                 'size INTEGER NOT NULL, '
+                                 'last_used REAL NOT NULL)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS analyses_last_used ON analyses (last_used)')
+        self._connection.commit()
+        # other processes may write to the same file, so the total is only an estimate
+        # and it is recounted before eviction
+        self._estimated_size = self._count_size()
+        # last_used of hit entries is updated on commit, not on every hit
+        self._used_keys = set()
+
+    def get(self, paragraph: str):
+        """
+        Returns cached analysis of a paragraph or None
+        """
+        key = self._make_key(paragraph)
+        row = self._connection.execute('SELECT analysis FROM analyses WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.counters['misses'] += 1
+            return None
+
+        self.counters['hits'] += 1
+        self._used_keys.add(key)
+        return json.loads(row[0])
+
+    def put(self, paragraph: str, analysis):
+        """
+        Stores analysis of a paragraph and evicts old entries if the cache is too large
+        """
+        serialized = json.dumps(analysis, ensure_ascii=False)
+        size = len(serialized.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        self._connection.execute('INSERT OR REPLACE INTO analyses (key, analysis, size, last_used) '
+                                 'VALUES (?, ?, ?, ?)',
+                                 (self._make_key(paragraph), serialized, size, time.time()))
+        self._estimated_size += size
+        if self._estimated_size > self.max_bytes:
+            self._evict()
+
+    def commit(self):
+        """
+        Saves analyses put and marks entries got since the previous commit as recently used
+        """
+        if self._used_keys:
+            now = time.time()
+            self._connection.executemany('UPDATE analyses SET last_used = ? WHERE key = ?',
+                                         [(now, key) for key in self._used_keys])
+            self._used_keys.clear()
+        self._connection.commit()
+
+    def get_stats(self):
+        """
+        Returns cache counters
+        """
+        entries = self._connection.execute('SELECT COUNT(*) FROM analyses').fetchone()[0]
+        return {
+            **self.counters,
+            'entries': entries,
+            'bytes': self._count_size(),
+            'max_bytes': self.max_bytes
+        }
+
+    def close(self):
+        """
+        Commits pending writes and closes the database connection
+        """
+        self.commit()
+        self._connection.close()
+
+    def _count_size(self):
+        return self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM analyses').fetchone()[0]
+
+    def _evict(self):
+        total_size = self._count_size()
+
+        rows = self._connection.execute('SELECT key, size FROM analyses ORDER BY last_used')
+        keys_to_delete = []
+        for key, size in rows:
+            if total_size <= self.max_bytes:
+                break
+            keys_to_delete.append((key,))
+            total_size -= size
+
+        self._connection.executemany('DELETE FROM analyses WHERE key = ?', keys_to_delete)
+        self.counters['evictions'] += len(keys_to_delete)
+        self._estimated_size = total_size
+
+    def _make_key(self, paragraph):
+        return hashlib.sha256(f'{self._key_prefix}\n{paragraph}'.encode('utf-8')).hexdigest()
@@ -0,0 +1,135 @@
+"""
+Pool of long-lived Mystem analyzers
+"""
+
+from contextlib import contextmanager
+import os
+import queue
+import threading
+
+from pymystem3 import Mystem
+
+
+class MystemPoolClosedError(Exception):
+    """
+    Analyzer requested from a pool that has already been closed
+    """
+
+
+class MystemPool:
+    """
+    Keeps a fixed number of warm Mystem subprocesses and lends them out.
+    A worker whose subprocess has died is restarted on the next checkout,
+    a worker that failed during analysis is restarted on return.
+    """
+
+    def __init__(self, size=None, factory=Mystem):
+        self.size = size or os.cpu_count() or 1
+        self.restarts = 0
+        self._factory = factory
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self, timeout=None):
+        """
+        Takes an idle healthy analyzer, spawning a new one if the pool is not full yet
+        """
+        if self._closed:
+            raise MystemPoolClosedError
+
+        try:
+            mystem = self._idle.get_nowait()
+        except queue.Empty:
+            mystem = self._spawn_if_allowed()
+            if mystem is None:
+                mystem = self._idle.get(timeout=timeout)
+
+        if not self._is_healthy(mystem):
+            mystem = self._restart(mystem)
+
+        return mystem
+
+    def release(self, mystem, broken=False):
+        """
+        Returns an analyzer to the pool, restarting it if it was marked as broken
+        """
+        if self._closed:
+            mystem.close()
+            return
+
+        if broken:
+            try:
+                mystem = self._restart(mystem)
+            except Exception:  # pylint: disable=broad-except
+                # the slot has been freed for the next acquire, the caller keeps its own analysis error
+                return
+
+        self._idle.put(mystem)
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """
+        Lends an analyzer for the duration of a with-block
+        """
+        mystem = self.acquire(timeout=timeout)
+        try:
+            yield mystem
+        except Exception:
+            self.release(mystem, broken=True)
+            raise
+        self.release(mystem)
+
+    def close(self):
+        """
+        Stops every idle analyzer subprocess
+        """
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def _spawn_if_allowed(self):
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+
+        try:
+            return self._spawn()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _spawn(self):
+        mystem = self._factory()
+        mystem.start()
+        return mystem
+
+    def _restart(self, mystem):
+        mystem.close()
+        self.restarts += 1
+        try:
+            return self._spawn()
+        except Exception:
+            # the closed analyzer no longer takes a slot, so the pool does not shrink for good
+            with self._lock:
+                self._created -= 1
+            raise
+
+    @staticmethod
+    def _is_healthy(mystem):
+        # pymystem3 keeps its subprocess handle in a protected attribute,
+        # poll() returns an exit code once the process has crashed or been killed
+        process = getattr(mystem, '_proc', None)
+        return process is not None and process.poll() is None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -2,11 +2,264 @@
 PDF files downloader implementation
 """
 
+from concurrent.futures import ProcessPoolExecutor
+import threading
+import time
+import weakref
 
-import wget
 import fitz
+import requests
 
 from constants import ASSETS_PATH
+from core_utils.http_client import HTTPClient, get_default_client
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+MAX_DOWNLOAD_ATTEMPTS = 3
+# seconds to connect and to wait for the next piece of data
+DOWNLOAD_TIMEOUT = (10, 60)
+# smaller documents are extracted in the current process, starting workers costs more
+MIN_PAGES_PER_WORKER = 16
+
+_DOWNLOADERS = weakref.WeakKeyDictionary()
+_DOWNLOADERS_LOCK = threading.Lock()
+
+
+class IncompleteDownloadError(Exception):
+    """
+    Downloaded file is shorter than the server has announced
+    """
+
+
+def get_validator(response):
+    """
+    Returns a validator of a response to be sent in If-Range, weak ETags are not allowed there
+    """
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response.headers.get('Last-Modified')
+
+
+class _FileTarget:
+    """
+    Writes a download to a .part file which is renamed once the download is complete,
+    the validator of the file is kept next to it to check that the file has not changed on resume
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.partial_path = path.with_name(path.name + '.part')
+        self.validator_path = path.with_name(path.name + '.part.validator')
+
+    def get_size(self):
+        return self.partial_path.stat().st_size if self.partial_path.exists() else 0
+
+    def get_validator(self):
+        if not self.validator_path.exists():
+            return None
+        return self.validator_path.read_text(encoding='utf-8') or None
+
+    def set_validator(self, validator):
+        self.validator_path.write_text(validator or '', encoding='utf-8')
+
+    def reset(self):
+        for path in (self.partial_path, self.validator_path):
+            if path.exists():
+                path.unlink()
+
+    def write(self, chunks, append: bool):
+        with open(self.partial_path, 'ab' if append else 'wb') as file:
+            for chunk in chunks:
+                file.write(chunk)
+
+    def use_cached(self, url, cache):
+        cache.copy_body(url, self.path)
+
+    def finish(self, url, cache, response):
+        self.partial_path.replace(self.path)
+        if self.validator_path.exists():
+            self.validator_path.unlink()
+        if cache is not None:
+            cache.store_file(url, response, self.path)
+
+
+class _MemoryTarget:
+    """
+    Collects a download in memory
+    """
+
+    def __init__(self):
+        self.content = bytearray()
+        self.validator = None
+
+    def get_size(self):
+        return len(self.content)
+
+    def get_validator(self):
+        return self.validator
+
+    def set_validator(self, validator):
+        self.validator = validator
+
+    def reset(self):
+        self.content.clear()
+        self.validator = None
+
+    def write(self, chunks, append: bool):
+        if not append:
+            self.content.clear()
+        for chunk in chunks:
+            self.content.extend(chunk)
+
+    def use_cached(self, url, cache):
+        self.content[:] = cache.load_body(url)
+
+    def finish(self, url, cache, response):
+        if cache is not None:
+            cache.store_body(url, response, bytes(self.content))
+
+
+class StreamingDownloader:
+    """
+    Downloads files in chunks through the shared HTTP client, either to disk or into memory.
+    An interrupted download is kept (as a .part file on disk) and continued with a Range request,
+    so a file is not downloaded from the beginning again on a flaky connection.
+    The request carries If-Range, so a file changed on the server is downloaded from the beginning.
+    """
+
+    def __init__(self, http_client: HTTPClient = None, max_attempts: int = MAX_DOWNLOAD_ATTEMPTS):
+        self.http_client = http_client or get_default_client()
+        self.max_attempts = max_attempts
+        self.bytes_downloaded = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def bytes_per_second(self):
+        """
+        Average download speed
+        """
+        return self.bytes_downloaded / self.seconds if self.seconds else 0.0
+
+    def get_stats(self):
+        """
+        Returns counters of downloaded bytes and time spent downloading them
+        """
+        with self._lock:
+            return {'bytes_downloaded': self.bytes_downloaded, 'download_seconds': self.seconds,
+                    'bytes_per_second': self.bytes_per_second}
+
+    def download(self, url: str, path):
+        """
+        Downloads a file to disk, resuming it after connection errors and incomplete responses
+        """
+        self._download(url, _FileTarget(path))
+        if self.http_client.archive is not None:
+            self.http_client.archive.append(url, 'application/pdf', path.read_bytes())
+
+    def fetch(self, url: str):
+        """
+        Downloads a file into memory and returns its content
+        """
+        target = _MemoryTarget()
+        self._download(url, target)
+        content = bytes(target.content)
+        if self.http_client.archive is not None:
+            self.http_client.archive.append(url, 'application/pdf', content)
+        return content
+
+    def _download(self, url, target):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self._download_once(url, target)
+                return
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError, IncompleteDownloadError):
+                if attempt == self.max_attempts:
+                    raise
+
+    def _download_once(self, url, target):
+        offset = target.get_size()
+        cache = self.http_client.cache
+        validator = target.get_validator()
+
+        # without a validator there is no telling whether the part belongs to the current file
+        if offset and validator is None:
+            target.reset()
+            offset = 0
+
+        if offset:
+            headers = {'Range': f'bytes={offset}-', 'If-Range': validator}
+        else:
+            headers = cache.get_validators(url) if cache is not None else {}
+
+        with self.http_client.get(url, stream=True, headers=headers, timeout=DOWNLOAD_TIMEOUT) as response:
+            if response.status_code == 304:
+                target.use_cached(url, cache)
+                return
+
+            # the part is broken or the file has changed on the server, starting over
+            if response.status_code == 416:
+                target.reset()
+                raise IncompleteDownloadError(f'{url}: range {offset}- is not satisfiable')
+
+            response.raise_for_status()
+            # the server ignores ranges or the file has changed, the whole file is sent
+            if response.status_code != 206:
+                offset = 0
+                target.set_validator(get_validator(response))
+
+            expected_size = self._get_expected_size(response, offset)
+            start = time.perf_counter()
+            try:
+                target.write(self._count(response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)),
+                             append=bool(offset))
+            finally:
+                with self._lock:
+                    self.seconds += time.perf_counter() - start
+
+        size = target.get_size()
+        if expected_size is not None and size != expected_size:
+            raise IncompleteDownloadError(f'{url}: {size} of {expected_size} bytes downloaded')
+
+        target.finish(url, cache, response)
+
+    def _count(self, chunks):
+        for chunk in chunks:
+            with self._lock:
+                self.bytes_downloaded += len(chunk)
+            yield chunk
+
+    @staticmethod
+    def _get_expected_size(response, offset):
+        # a compressed body is decoded while read, so its length cannot be compared
+        if 'Content-Length' not in response.headers or response.headers.get('Content-Encoding'):
+            return None
+        return offset + int(response.headers['Content-Length'])
+
+
+def get_downloader(http_client: HTTPClient = None):
+    """
+    Returns the downloader shared by all files downloaded through a client,
+    so that its download speed metrics cover all of them
+    """
+    http_client = http_client or get_default_client()
+    with _DOWNLOADERS_LOCK:
+        if http_client not in _DOWNLOADERS:
+            _DOWNLOADERS[http_client] = StreamingDownloader(http_client)
+        return _DOWNLOADERS[http_client]
+
+
+class PDFStorage:
+    """
+    Where a downloaded PDF is kept and its text is extracted from
+    """
+    # downloaded to disk, resumed after a failure from the .part file, read from disk
+    disk = 'disk'
+    # read right from the downloaded bytes, a copy is saved to disk and never read back
+    memory = 'memory'
+    # read right from the downloaded bytes and never saved
+    memory_only = 'memory_only'
 
 
 class PDFRawFile:
@@ -15,27 +268,127 @@ class PDFRawFile:
     Knows how to download PDF from a given URL.
     Manages PDF's text.
     """
-    def __init__(self, journal_url: str, journal_id: int):
+    def __init__(self, journal_url: str, journal_id: int, downloader: StreamingDownloader = None,
+                 storage: str = PDFStorage.disk):
         self._url = journal_url
         self._id = journal_id
+        # a downloader shared by several files sums up their download speed metrics
+        self.downloader = downloader or get_downloader()
+        self.storage = storage
         self.text = None
+        self._content = None
 
     def download(self):
         """
         Downloads PDF file by the URL given.
         """
-        wget.download(self._url, str(ASSETS_PATH / f"{self._id}_raw.pdf"))
+        if self.storage == PDFStorage.disk:
+            self.downloader.download(self._url, self._get_path())
+            return
 
-    def get_text(self):
+        self._content = self.downloader.fetch(self._url)
+        if self.storage == PDFStorage.memory:
+            self._get_path().write_bytes(self._content)
+
+    def get_text(self, workers: int = None):
         """
         Gets text from the PDF file downloaded.
+        With several workers page ranges are extracted in separate processes.
+        """
+        if workers is None or workers <= 1:
+            return ''.join(self.iter_pages())
+
+        source = self._get_source()
+        with _open_pdf(source) as pdf:
+            page_count = pdf.page_count
+
+        workers = min(workers, page_count // MIN_PAGES_PER_WORKER)
+        if workers <= 1:
+            return ''.join(self.iter_pages())
+
+        bounds = [page_count * i // workers for i in range(workers + 1)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = executor.map(_extract_page_range, [source] * workers, bounds[:-1], bounds[1:])
+            return ''.join(parts)
+
+    def get_text_up_to(self, markers):
         """
-        text = ""
-        with fitz.open(ASSETS_PATH / f"{self._id}_raw.pdf") as pdf:
+        Gets text of the pages up to and including the page of a heading containing any of markers.
+        The heading is looked up in the outline of the PDF, so pages after it are never extracted,
+        without an outline entry the last page containing a marker is searched from the end.
+        Returns None if no page contains a marker.
+        """
+        with _open_pdf(self._get_source()) as pdf:
+            found = _find_outline_page(pdf, markers) or _find_last_page(pdf, markers)
+            if found is None:
+                return None
+
+            last_page, last_page_text = found
+            pages = [pdf[page_number].get_text() for page_number in range(last_page)]
+        pages.append(last_page_text)
+        return ''.join(pages)
+
+    def iter_pages(self):
+        """
+        Yields text of the PDF file downloaded page by page.
+        """
+        with _open_pdf(self._get_source()) as pdf:
             for page in pdf:
-                text += page.get_text()
-        return text
+                yield page.get_text()
+
+    def _get_source(self):
+        """
+        Returns downloaded bytes if the PDF is kept in memory and a path to it otherwise
+        """
+        return self._content if self._content is not None else str(self._get_path())
+
+    def _get_path(self):
+        return ASSETS_PATH / f"{self._id}_raw.pdf"
 
     @property
     def own_id(self):
         return self._id
+
+
+def _open_pdf(source):
+    """
+    Opens a PDF from bytes or from a path
+    """
+    if isinstance(source, bytes):
+        return fitz.open(stream=source, filetype='pdf')
+    return fitz.open(source)
+
+
+def _find_outline_page(pdf, markers):
+    """
+    Returns the number and text of the page of the last outline entry containing any of markers,
+    None if there is no such entry or the page does not contain the marker
+    """
+    for _, title, page in reversed(pdf.get_toc()):
+        if not 1 <= page <= pdf.page_count or not any(marker in title for marker in markers):
+            continue
+        # outlines may point to a wrong page, the page text has to confirm it
+        page_text = pdf[page - 1].get_text()
+        if any(marker in page_text for marker in markers):
+            return page - 1, page_text
+        return None
+    return None
+
+
+def _find_last_page(pdf, markers):
+    """
+    Returns the number and text of the last page containing any of markers, None if there is no such page
+    """
+    for page_number in range(pdf.page_count - 1, -1, -1):
+        page_text = pdf[page_number].get_text()
+        if any(marker in page_text for marker in markers):
+            return page_number, page_text
+    return None
+
+
+def _extract_page_range(source, start: int, stop: int):
+    """
+    Extracts text of pages from start to stop, runs in a worker process
+    """
+    with _open_pdf(source) as pdf:
+        return ''.join(pdf[page_number].get_text() for page_number in range(start, stop))
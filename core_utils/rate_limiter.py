@@ -0,0 +1,119 @@
+"""
+Per-host rate limiting of scrapper requests
+"""
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import threading
+import time
+from urllib.parse import urlparse
+
+DEFAULT_RATE = 1.0
+DEFAULT_BURST = 2
+# status codes with which a site asks to slow down
+THROTTLING_STATUS_CODES = (429, 503)
+# pause after a throttling response that has no Retry-After header
+DEFAULT_THROTTLING_DELAY = 30.0
+MAX_RETRY_AFTER = 600.0
+
+
+def parse_retry_after(value, now: datetime = None):
+    """
+    Returns Retry-After header value in seconds, it may be given either in seconds or as an HTTP date
+    """
+    if not value:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max((retry_at - now).total_seconds(), 0.0)
+
+
+class TokenBucket:
+    """
+    Lets `burst` requests go at once and then `rate` requests per second
+    """
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+        self.blocked_until = now
+
+    def reserve(self, now: float):
+        """
+        Takes a token and returns how many seconds to wait before using it
+        """
+        # requests reserved during a pause are scheduled after it, no more than `burst` of them at once
+        start = max(now, self.blocked_until, self.updated)
+        self.tokens = min(self.burst, self.tokens + (start - self.updated) * self.rate)
+        self.updated = start
+        # a token is taken in advance even if it is not there yet, so that waiting requests queue up
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return start - now + wait
+
+
+class HostRateLimiter:
+    """
+    Token bucket rate limiter with a separate bucket for every host.
+    A host that answered with 429 or 503 is paused for the time it asked in Retry-After.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.throttled_responses = 0
+        self._clock = clock
+        self._sleep = sleep
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str):
+        """
+        Blocks until a request to the url's host may be sent
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            now = self._clock()
+            bucket = self._buckets.setdefault(host, TokenBucket(self.rate, self.burst, now))
+            wait = bucket.reserve(now)
+
+        if wait > 0:
+            self._sleep(wait)
+
+    def pause(self, url: str, seconds: float):
+        """
+        Stops requests to the url's host for the given number of seconds
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            now = self._clock()
+            bucket = self._buckets.setdefault(host, TokenBucket(self.rate, self.burst, now))
+            bucket.blocked_until = max(bucket.blocked_until, now + seconds)
+
+    def observe(self, response):
+        """
+        Pauses the host of a response if it asks to slow down,
+        returns True in that case
+        """
+        if response.status_code not in THROTTLING_STATUS_CODES:
+            return False
+
+        self.throttled_responses += 1
+        delay = parse_retry_after(response.headers.get('Retry-After'))
+        if delay is None:
+            delay = DEFAULT_THROTTLING_DELAY
+        self.pause(response.url, min(delay, MAX_RETRY_AFTER))
+        return True
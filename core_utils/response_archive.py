@@ -0,0 +1,165 @@
+"""
+WARC-style archive of fetched responses for re-parsing articles offline
+"""
+
+from datetime import datetime, timezone
+import gzip
+import json
+import threading
+import uuid
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+class ResponseArchive:
+    """
+    Append-only file of gzip members, one WARC-style resource record per fetched page or PDF,
+    so that a record is decompressed on its own after a seek to its offset.
+    Offsets are kept in an index file next to the archive, one JSON line per record,
+    the last record of a url wins.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path.with_name(path.name + '.idx')
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._index = {}
+        self._lock = threading.Lock()
+        self._reader = None
+        self._load_index()
+
+    def __contains__(self, url):
+        return url in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def append(self, url: str, content_type: str, body: bytes):
+        """
+        Appends a response body to the archive
+        """
+        headers = [
+            'WARC/1.0',
+            'WARC-Type: resource',
+            f'WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>',
+            f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}",
+            f'WARC-Target-URI: {url}',
+            f'Content-Type: {content_type or "application/octet-stream"}',
+            f'Content-Length: {len(body)}'
+        ]
+        record = gzip.compress('\r\n'.join(headers).encode('utf-8') + b'\r\n\r\n' + body + b'\r\n\r\n')
+
+        with self._lock:
+            with open(self.path, 'ab') as file:
+                offset = file.tell()
+                file.write(record)
+            # a crash right here loses only the index line, the record is still in the archive
+            with open(self.index_path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps({'url': url, 'offset': offset, 'length': len(record)}, ensure_ascii=False)
+                           + '\n')
+            self._index[url] = (offset, len(record))
+
+    def read(self, url: str):
+        """
+        Returns headers and body of the last record of a url
+        """
+        offset, length = self._index[url]
+        with self._lock:
+            if self._reader is None:
+                self._reader = open(self.path, 'rb')
+            self._reader.seek(offset)
+            record = gzip.decompress(self._reader.read(length))
+
+        head, body = record.split(b'\r\n\r\n', 1)
+        headers = CaseInsensitiveDict(line.split(': ', 1) for line in head.decode('utf-8').split('\r\n')[1:])
+        return headers, body[:int(headers['Content-Length'])]
+
+    def build_response(self, url: str):
+        """
+        Returns an archived response as if it had been fetched, 404 if the url has not been archived
+        """
+        response = requests.Response()
+        response.url = url
+        if url not in self._index:
+            response.status_code = 404
+            response._content = b''  # pylint: disable=protected-access
+            # there is no connection to close, a streamed 404 is closed by its reader all the same
+            response._content_consumed = True  # pylint: disable=protected-access
+            return response
+
+        headers, body = self.read(url)
+        response.status_code = 200
+        response.headers = CaseInsensitiveDict({'Content-Type': headers['Content-Type'],
+                                                'Content-Length': str(len(body))})
+        # the same encoding requests would have given to the fetched response
+        response.encoding = get_encoding_from_headers(response.headers)
+        # marked as read, so that it can be streamed and closed without a connection
+        response._content = body  # pylint: disable=protected-access
+        response._content_consumed = True  # pylint: disable=protected-access
+        return response
+
+    def close(self):
+        """
+        Closes the archive file
+        """
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def _load_index(self):
+        if not self.index_path.exists():
+            return
+
+        with open(self.index_path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # the last line may be cut off by a crash
+                    continue
+                self._index[entry['url']] = (entry['offset'], entry['length'])
+
+
+class ArchiveClient:
+    """
+    Stands in for HTTPClient answering every request from an archive without network traffic
+    """
+
+    def __init__(self, source: ResponseArchive):
+        self.source = source
+        # responses are neither revalidated nor archived again
+        self.cache = None
+        self.archive = None
+        self.served = 0
+        self.missing = 0
+
+    def get(self, url: str, **kwargs):  # pylint: disable=unused-argument
+        """
+        Returns an archived response, request arguments have no effect on it
+        """
+        response = self.source.build_response(url)
+        if response.ok:
+            self.served += 1
+        else:
+            self.missing += 1
+        return response
+
+    def get_stats(self):
+        """
+        Returns counters of archived and missing responses
+        """
+        return {'served': self.served, 'missing': self.missing}
+
+    def close(self):
+        """
+        Closes the archive
+        """
+        self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,102 @@
+"""
+Timing of pipeline stages
+"""
+
+from contextlib import contextmanager
+import json
+import time
+
+
+def _empty_counters():
+    return {'seconds': 0.0, 'calls': 0, 'tokens': 0, 'bytes': 0}
+
+
+class StageMeasurement:
+    """
+    Counters of a single measured block, tokens and bytes may be set inside the block
+    """
+
+    def __init__(self, tokens: int = 0, size: int = 0):
+        self.tokens = tokens
+        self.size = size
+
+
+class StageTimer:
+    """
+    Aggregates wall time, number of processed tokens and bytes per stage
+    for the whole run and for every article
+    """
+
+    def __init__(self):
+        self._stages = {}
+        self._articles = {}
+
+    @contextmanager
+    def measure(self, stage: str, article_id=None, tokens: int = 0, size: int = 0):
+        """
+        Measures a with-block as a part of a stage
+        """
+        measurement = StageMeasurement(tokens, size)
+        start = time.perf_counter()
+        try:
+            yield measurement
+        finally:
+            self._add(stage, article_id, {
+                'seconds': time.perf_counter() - start,
+                'calls': 1,
+                'tokens': measurement.tokens,
+                'bytes': measurement.size
+            })
+
+    def get_state(self):
+        """
+        Returns raw counters that can be merged into another timer
+        """
+        return {'stages': self._stages, 'articles': self._articles}
+
+    def merge(self, state):
+        """
+        Adds raw counters of another timer, e.g. the one of a worker process
+        """
+        for stage, counters in state['stages'].items():
+            self._add(stage, None, counters)
+        for article_id, stages in state['articles'].items():
+            for stage, counters in stages.items():
+                self._add_to(self._articles.setdefault(article_id, {}), stage, counters)
+
+    def get_report(self):
+        """
+        Returns counters with throughput of every stage
+        """
+        return {
+            'stages': {stage: _with_throughput(counters) for stage, counters in self._stages.items()},
+            'articles': {str(article_id): {stage: _with_throughput(counters)
+                                           for stage, counters in stages.items()}
+                         for article_id, stages in sorted(self._articles.items())}
+        }
+
+    def dump(self, path):
+        """
+        Saves the report as JSON
+        """
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.get_report(), file, indent=4, ensure_ascii=False)
+
+    def _add(self, stage, article_id, counters):
+        self._add_to(self._stages, stage, counters)
+        if article_id is not None:
+            self._add_to(self._articles.setdefault(article_id, {}), stage, counters)
+
+    @staticmethod
+    def _add_to(stages, stage, counters):
+        stage_counters = stages.setdefault(stage, _empty_counters())
+        for name, value in counters.items():
+            stage_counters[name] += value
+
+
+def _with_throughput(counters):
+    report = dict(counters)
+    seconds = counters['seconds']
+    report['tokens_per_second'] = counters['tokens'] / seconds if seconds else 0.0
+    report['bytes_per_second'] = counters['bytes'] / seconds if seconds else 0.0
+    return report
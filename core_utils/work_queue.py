@@ -0,0 +1,168 @@
+"""
+Work queue shared by crawl worker processes through a sqlite file
+"""
+
+from contextlib import contextmanager
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+DEFAULT_VISIBILITY_TIMEOUT = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+class SQLiteWorkQueue:
+    """
+    Queue of article urls in a sqlite file shared by worker processes on one host,
+    sqlite locking is not reliable on network filesystems, so the file must be on a local disk.
+    A leased item is hidden from other workers for visibility_timeout seconds,
+    a worker still busy with it extends the lease with keep_leased.
+    If it is neither completed nor released by then, it becomes visible again,
+    so items of a dead worker are retried. An item leased max_attempts times is marked as failed.
+    """
+
+    def __init__(self, path, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, clock=time.time):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self._clock = clock
+        # transactions are opened explicitly, so that a lease is taken by one worker only
+        self._connection = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+        # readers and the writer of processes on the same host do not block each other
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS items ('
+                                 'item_id INTEGER PRIMARY KEY, '
+                                 'url TEXT NOT NULL, '
+                                 'status TEXT NOT NULL, '
+                                 'attempts INTEGER NOT NULL, '
+                                 'owner TEXT, '
+                                 'visible_at REAL NOT NULL, '
+                                 'error TEXT)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS items_status ON items (status, visible_at)')
+
+    def put_many(self, items):
+        """
+        Adds (item id, url) pairs, items added before with the same url keep their state.
+        An item id given another url belongs to a different crawl, so the item is scraped anew.
+        """
+        with self._transaction():
+            self._connection.executemany("INSERT INTO items (item_id, url, status, attempts, visible_at) "
+                                         "VALUES (?, ?, 'pending', 0, 0) "
+                                         "ON CONFLICT (item_id) DO UPDATE SET url = excluded.url, "
+                                         "status = 'pending', attempts = 0, owner = NULL, visible_at = 0, "
+                                         "error = NULL WHERE url != excluded.url", items)
+
+    def reset(self):
+        """
+        Removes all items
+        """
+        with self._transaction():
+            self._connection.execute('DELETE FROM items')
+
+    def lease(self):
+        """
+        Takes the next visible item for visibility_timeout seconds,
+        returns its (item id, url) or None if no item is visible now
+        """
+        now = self._clock()
+        with self._transaction():
+            self._connection.execute("UPDATE items SET status = 'failed' "
+                                     "WHERE status = 'pending' AND visible_at <= ? AND attempts >= ?",
+                                     (now, self.max_attempts))
+            row = self._connection.execute("SELECT item_id, url FROM items "
+                                           "WHERE status = 'pending' AND visible_at <= ? "
+                                           "ORDER BY item_id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                return None
+            self._connection.execute('UPDATE items SET owner = ?, visible_at = ?, attempts = attempts + 1 '
+                                     'WHERE item_id = ?',
+                                     (self.worker_id, now + self.visibility_timeout, row[0]))
+        return row
+
+    def complete(self, item_id: int):
+        """
+        Marks a leased item as done
+        """
+        self._update_leased(item_id, "UPDATE items SET status = 'done' WHERE item_id = ? AND owner = ?")
+
+    def extend(self, item_id: int):
+        """
+        Hides a leased item for another visibility_timeout seconds,
+        returns False if the lease has expired and the item has been taken by another worker
+        """
+        return self._update_leased(item_id, "UPDATE items SET visible_at = ? "
+                                            "WHERE item_id = ? AND owner = ? AND status = 'pending'",
+                                   self._clock() + self.visibility_timeout)
+
+    @contextmanager
+    def keep_leased(self, item_id: int):
+        """
+        Extends the lease of an item every third of visibility_timeout while the with-block runs,
+        so that an item processed for longer than visibility_timeout is not leased by another worker
+        """
+        stop = threading.Event()
+
+        def beat():
+            # sqlite connections are bound to the thread that has opened them
+            heartbeat_queue = SQLiteWorkQueue(self.path, self.visibility_timeout, self.max_attempts, self._clock)
+            try:
+                while not stop.wait(self.visibility_timeout / 3) and heartbeat_queue.extend(item_id):
+                    pass
+            finally:
+                heartbeat_queue.close()
+
+        heartbeat = threading.Thread(target=beat, daemon=True)
+        heartbeat.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            heartbeat.join()
+
+    def release(self, item_id: int, error: str = None):
+        """
+        Returns a leased item that has failed to the queue for another attempt
+        """
+        self._update_leased(item_id, 'UPDATE items SET visible_at = ?, error = ? WHERE item_id = ? AND owner = ?',
+                            self._clock(), error)
+
+    def is_finished(self):
+        """
+        Checks whether every item is done or failed, leased items are not finished yet
+        """
+        row = self._connection.execute("SELECT COUNT(*) FROM items WHERE status = 'pending'").fetchone()
+        return row[0] == 0
+
+    def get_counts(self):
+        """
+        Returns numbers of items by status
+        """
+        counts = {'pending': 0, 'done': 0, 'failed': 0}
+        counts.update(self._connection.execute('SELECT status, COUNT(*) FROM items GROUP BY status'))
+        return counts
+
+    def close(self):
+        """
+        Closes the database connection
+        """
+        self._connection.close()
+
+    def _update_leased(self, item_id, query, *params):
+        # a lease that has expired and been taken by another worker is not touched
+        with self._transaction():
+            cursor = self._connection.execute(query, (*params, item_id, self.worker_id))
+        return cursor.rowcount > 0
+
+    @contextmanager
+    def _transaction(self):
+        self._connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._connection.execute('ROLLBACK')
+            raise
+        self._connection.execute('COMMIT')
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark of parsing seed and article pages with a full tree and with targeted parsing
+"""
+
+import argparse
+import json
+import timeit
+
+from constants import CRAWLER_CONFIG_PATH
+from core_utils.http_client import get_default_client
+from scrapper import ARTICLE_PAGE_STRAINER, FAST_HTML_BACKEND, SEED_PAGE_STRAINER, Crawler, get_page_text, make_soup
+
+
+def parse_seed_page(markup: str, targeted: bool):
+    """
+    Parses a seed page as Crawler does
+    """
+    seed_bs = make_soup(markup, SEED_PAGE_STRAINER if targeted else None)
+    return seed_bs.find_all("a", class_="article__title")
+
+
+def parse_article_page(markup: str, targeted: bool):
+    """
+    Parses an article page as HTMLParser does
+    """
+    if targeted:
+        return make_soup(markup, ARTICLE_PAGE_STRAINER), get_page_text(markup)
+    article_bs = make_soup(markup)
+    return article_bs, article_bs.text
+
+
+def measure(parse, markup: str, targeted: bool, repeat: int):
+    """
+    Returns the best time of parsing a page in seconds
+    """
+    return min(timeit.repeat(lambda: parse(markup, targeted), number=1, repeat=repeat))
+
+
+def main():
+    """
+    Fetches the first seed page and the first article on it and compares parse times
+    """
+    args_parser = argparse.ArgumentParser(description='Compares full and targeted parsing of pages')
+    args_parser.add_argument('--repeat', type=int, default=20, help='Number of parses of every page')
+    args = args_parser.parse_args()
+
+    with open(CRAWLER_CONFIG_PATH, encoding='utf-8') as file:
+        seed_url = json.load(file)['seed_urls'][0]
+
+    crawler = Crawler([seed_url], 1)
+    crawler.find_articles()
+    client = get_default_client()
+    pages = {
+        'seed page': (parse_seed_page, client.get(seed_url).text),
+        'article page': (parse_article_page, client.get(crawler.urls[0]).text)
+    }
+
+    print(f'targeted parsing backend: {FAST_HTML_BACKEND}')
+    for name, (parse, markup) in pages.items():
+        full = measure(parse, markup, False, args.repeat)
+        targeted = measure(parse, markup, True, args.repeat)
+        print(f'{name:<14}{len(markup) / 1024:8.1f} KB  full {full * 1000:8.2f} ms  '
+              f'targeted {targeted * 1000:8.2f} ms  x{full / targeted:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,14 +2,31 @@
 Pipeline for text processing implementation
 """
 
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from itertools import chain
 from pathlib import Path
 import re
 
-import pymorphy2
-from pymystem3 import Mystem
-
 from constants import ASSETS_PATH
 from core_utils.article import Article, ArtifactType
+from core_utils.manifest import ProcessingManifest, get_manifest_path
+from core_utils.morph_cache import MorphParseCache, get_morph_analyzer, get_parse_cache
+from core_utils.mystem_cache import MystemResultCache
+from core_utils.mystem_pool import MystemPool
+from core_utils.timing import StageTimer
+
+# texts of several articles are analyzed by Mystem in one request,
+# the mark consists of non-word characters only so that it never becomes a part of a word
+BATCH_MARK = '§§§'
+BATCH_SEPARATOR = f' . {BATCH_MARK} . '
+PARAGRAPH_SEPARATOR = re.compile(r'\n\s*\n')
+# number of distinct word forms tagged by one worker at a time
+FORMS_CHUNK_SIZE = 5000
+# raw texts are scanned for distinct word forms by pieces of this number of characters
+FORMS_SCAN_CHUNK_SIZE = 1_000_000
 
 
 class EmptyDirectoryError(Exception):
@@ -32,6 +49,8 @@ class MorphologicalToken:
     Stores language params for each processed token
     """
 
+    __slots__ = ('original_word', 'normalized_form', 'tags_mystem', 'tags_pymorphy')
+
     def __init__(self, original_word):
         self.original_word = original_word
         self.normalized_form = ''
@@ -57,6 +76,154 @@ class MorphologicalToken:
         return f'{self.normalized_form}<{self.tags_mystem}>({self.tags_pymorphy})'
 
 
+class TokenTable:
+    """
+    Stores processed tokens of a text column by column.
+    Every string is interned once per table and tokens keep only its id,
+    MorphologicalToken instances are created on access as views of a row.
+    """
+
+    def __init__(self):
+        self.original_words = array('I')
+        self.normalized_forms = array('I')
+        self.tags_mystem = array('I')
+        self.tags_pymorphy = array('I')
+        self._strings = []
+        self._string_ids = {}
+
+    def append(self, original_word, normalized_form, tags_mystem, tags_pymorphy):
+        """
+        Adds a token to the end of the table
+        """
+        self.original_words.append(self._intern(original_word))
+        self.normalized_forms.append(self._intern(normalized_form))
+        self.tags_mystem.append(self._intern(tags_mystem))
+        self.tags_pymorphy.append(self._intern(tags_pymorphy))
+
+    def get_cleaned(self):
+        """
+        Returns lowercased original forms of all tokens joined with spaces
+        """
+        lowered = [string.lower() for string in self._strings]
+        return ' '.join([lowered[word_id] for word_id in self.original_words])
+
+    def get_single_tagged(self):
+        """
+        Returns normalized lemmas with MyStem tags of all tokens joined with spaces
+        """
+        rendered = {}
+        single_tagged = []
+        for key in zip(self.normalized_forms, self.tags_mystem):
+            if key not in rendered:
+                rendered[key] = f'{self._strings[key[0]]}<{self._strings[key[1]]}>'
+            single_tagged.append(rendered[key])
+        return ' '.join(single_tagged)
+
+    def get_multiple_tagged(self):
+        """
+        Returns normalized lemmas with MyStem and PyMorphy tags of all tokens joined with spaces
+        """
+        rendered = {}
+        multiple_tagged = []
+        for key in zip(self.normalized_forms, self.tags_mystem, self.tags_pymorphy):
+            if key not in rendered:
+                lemma, tags_mystem, tags_pymorphy = (self._strings[string_id] for string_id in key)
+                rendered[key] = f'{lemma}<{tags_mystem}>({tags_pymorphy})'
+            multiple_tagged.append(rendered[key])
+        return ' '.join(multiple_tagged)
+
+    def _intern(self, value):
+        value = str(value)
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(value)
+            self._string_ids[value] = string_id
+        return string_id
+
+    def __getitem__(self, index):
+        morph_token = MorphologicalToken(original_word=self._strings[self.original_words[index]])
+        morph_token.normalized_form = self._strings[self.normalized_forms[index]]
+        morph_token.tags_mystem = self._strings[self.tags_mystem[index]]
+        morph_token.tags_pymorphy = self._strings[self.tags_pymorphy[index]]
+        return morph_token
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __len__(self):
+        return len(self.original_words)
+
+
+class FormTable:
+    """
+    Pymorphy tags of distinct word forms of the corpus tagged beforehand,
+    counts tokens whose tags have been taken from it
+    """
+
+    def __init__(self, parses: dict = None):
+        self.parses = parses or {}
+        self.hits = 0
+
+    def get_tags(self, form: str):
+        """
+        Returns pymorphy tags of a word form or None if it has not been tagged beforehand
+        """
+        parse = self.parses.get(form)
+        if parse is None:
+            return None
+        self.hits += 1
+        return parse[0]
+
+    def get_stats(self):
+        """
+        Returns how many pymorphy parses the table has saved
+        """
+        return {
+            'distinct_forms': len(self.parses),
+            'tokens_from_table': self.hits,
+            'parses_avoided': max(self.hits - len(self.parses), 0)
+        }
+
+
+@dataclass
+class PipelineOptions:
+    """
+    Tuning options of TextProcessingPipeline, defaults process articles
+    one by one in the current process as the simple pipeline does
+    """
+
+    # more than one worker fans articles out to a process pool
+    workers: int = None
+    # approximate number of characters sent to Mystem in one request,
+    # None analyzes every article separately
+    batch_size: int = None
+    # tag every distinct word form of the corpus once before processing articles
+    deduplicate_forms: bool = False
+    # raw texts larger than this number of characters are analyzed and saved
+    # chunk by chunk, None keeps every text in memory as a whole
+    stream_chunk_size: int = None
+    # skip articles whose raw text and analyzers have not changed since the previous run
+    incremental: bool = False
+
+
+@dataclass
+class PipelineResources:
+    """
+    Analyzers, caches and the timer TextProcessingPipeline may share with other pipelines
+    """
+
+    # analyses of paragraphs seen before are taken from the cache instead of Mystem
+    mystem_cache: MystemResultCache = None
+    # a pool shared with other pipelines, the pipeline creates and closes its own one otherwise
+    mystem_pool: MystemPool = None
+    # pymorphy parses are shared across articles and pipelines unless a cache is given
+    morph_cache: MorphParseCache = None
+    # time spent in every stage, get_report() or dump() it after the run
+    timer: StageTimer = field(default_factory=StageTimer)
+
+
 class CorpusManager:
     """
     Works with articles and stores them
@@ -95,45 +262,384 @@ class TextProcessingPipeline:
     Process articles from corpus manager
     """
 
-    def __init__(self, corpus_manager: CorpusManager):
+    def __init__(self, corpus_manager: CorpusManager, options: PipelineOptions = None,
+                 resources: PipelineResources = None):
         self.corpus_manager = corpus_manager
+        self.options = options or PipelineOptions()
+        self.resources = resources or PipelineResources()
+        self.failed_articles = {}
+        self.skipped_articles = []
+        self._form_table = FormTable()
+        # created on first use unless resources give a shared pool, closed after run
+        self._own_pool = None
+
+    @property
+    def timer(self):
+        """
+        Timer of pipeline stages
+        """
+        return self.resources.timer
+
+    @property
+    def form_stats(self):
+        """
+        Counters of the form table, empty unless forms are deduplicated
+        """
+        return self._form_table.get_stats() if self.options.deduplicate_forms else {}
 
     def run(self):
         """
         Runs pipeline process scenario
         """
-        articles = self.corpus_manager.get_articles().values()
+        # articles processed before a failure are not processed again on the next run
+        manifest = None
+        if self.options.incremental:
+            manifest = ProcessingManifest(get_manifest_path(self.corpus_manager.path))
+
+        with self.timer.measure('run'):
+            with self.timer.measure('select_articles'):
+                articles = self._select_articles(manifest)
+
+            if self.options.deduplicate_forms:
+                with self.timer.measure('form_table'):
+                    self._build_form_table(articles)
+
+            try:
+                if self.options.workers is not None and self.options.workers > 1:
+                    self._run_articles_in_parallel(articles, manifest)
+                else:
+                    self._run_articles_in_own_process(articles, manifest)
+            finally:
+                if manifest is not None:
+                    manifest.save()
+
+    def _select_articles(self, manifest):
+        """
+        Returns articles to be processed, in incremental mode up to date ones are left out
+        """
+        articles = list(self.corpus_manager.get_articles().values())
+        self.skipped_articles = []
+        if manifest is None:
+            return articles
+
+        articles_to_process = []
         for article in articles:
-            raw_text = article.get_raw_text()
-            processed_tokens = self._process(raw_text)
+            if manifest.is_up_to_date(article):
+                self.skipped_articles.append(article.article_id)
+            else:
+                articles_to_process.append(article)
+        return articles_to_process
 
-            cleaned_tokens = []
-            single_tagged_tokens = []
-            multiple_tagged_tokens = []
+    def _run_articles_in_own_process(self, articles, manifest):
+        """
+        Processes articles with the pipeline's Mystem pool
+        """
+        try:
+            self._run_articles(articles, manifest)
+        finally:
+            if self._own_pool is not None:
+                self._own_pool.close()
+                self._own_pool = None
+
+    def _run_articles(self, articles, manifest):
+        """
+        Processes every article and saves its artifacts
+        """
+        for batch in self._group_articles(articles):
+            self._process_batch(batch)
+            _record_processed(manifest, batch)
+
+    def _run_articles_in_parallel(self, articles, manifest):
+        """
+        Processes batches of articles in a pool of worker processes,
+        a failed article is recorded and does not stop the others
+        """
+        self.failed_articles = {}
+
+        with ProcessPoolExecutor(max_workers=self.options.workers,
+                                 initializer=_init_worker_pipeline,
+                                 initargs=(self._form_table.parses, self.options.stream_chunk_size,
+                                           self._get_mystem_cache_params())) as executor:
+            futures = {executor.submit(_process_batch_in_worker, batch): batch
+                       for batch in self._group_articles(articles)}
+            for future in as_completed(futures):
+                try:
+                    _, table_hits, timer_state = future.result()
+                    self._form_table.hits += table_hits
+                    self.timer.merge(timer_state)
+                    _record_processed(manifest, futures[future])
+                except Exception as error:  # pylint: disable=broad-except
+                    for article in futures[future]:
+                        self.failed_articles[article.article_id] = f'{type(error).__name__}: {error}'
+
+        for article_id, message in sorted(self.failed_articles.items()):
+            print(f"Article {article_id} was not processed: {message}")
+
+    def _get_mystem_cache_params(self):
+        """
+        Returns what a worker process needs to open its own connection to the Mystem cache
+        """
+        mystem_cache = self.resources.mystem_cache
+        if mystem_cache is None:
+            return None
+        return mystem_cache.path, mystem_cache.max_bytes
+
+    def _build_form_table(self, articles):
+        """
+        Collects distinct word forms of the whole corpus and tags each of them once,
+        in chunks spread over worker processes if more than one worker is set
+        """
+        word_pattern = re.compile(r'\w+(?:-\w+)*')
+        forms = set()
+        for article in articles:
+            with open(article.get_raw_text_path(), encoding='utf-8') as file:
+                for chunk in iter_text_chunks(file, FORMS_SCAN_CHUNK_SIZE):
+                    forms.update(word_pattern.findall(self._prepare_text(chunk)))
+
+        forms = sorted(forms)
+        chunks = [forms[i:i + FORMS_CHUNK_SIZE] for i in range(0, len(forms), FORMS_CHUNK_SIZE)]
+
+        self._form_table = FormTable()
+        workers = self.options.workers
+        if workers is not None and workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for parses in executor.map(_tag_forms, chunks):
+                    self._form_table.parses.update(parses)
+        else:
+            for chunk in chunks:
+                self._form_table.parses.update(_tag_forms(chunk))
 
+    def _group_articles(self, articles):
+        """
+        Splits articles into batches whose raw texts fit into batch_size characters,
+        raw file size is used as an estimate so that texts are not read twice.
+        Articles to be streamed always form a batch of their own.
+        """
+        if not self.options.batch_size:
+            return [[article] for article in articles]
 
-            for processed_token in processed_tokens:
-                cleaned_tokens.append(processed_token.get_cleaned())
-                single_tagged_tokens.append(processed_token.get_single_tagged())
-                multiple_tagged_tokens.append(processed_token.get_multiple_tagged())
+        batches = []
+        batch = []
+        batch_length = 0
+        for article in articles:
+            if self._is_streamed(article):
+                batches.append([article])
+                continue
 
-            article.save_as(' '.join(cleaned_tokens), ArtifactType.cleaned)
-            article.save_as(' '.join(single_tagged_tokens), ArtifactType.single_tagged)
-            article.save_as(' '.join(multiple_tagged_tokens), ArtifactType.multiple_tagged)
+            length = article.get_raw_text_path().stat().st_size
+            if batch and batch_length + length > self.options.batch_size:
+                batches.append(batch)
+                batch = []
+                batch_length = 0
+            batch.append(article)
+            batch_length += length
+
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _process_batch(self, articles):
+        """
+        Analyzes raw texts of several articles at once and saves artifacts of each of them
+        """
+        if len(articles) == 1 and self._is_streamed(articles[0]):
+            self._process_article_streaming(articles[0])
+            return
+
+        raw_texts = []
+        for article in articles:
+            with self.timer.measure('read', article.article_id) as measurement:
+                raw_texts.append(article.get_raw_text())
+                measurement.size = article.get_raw_text_path().stat().st_size
+
+        # stages shared by several articles are not attributed to any of them
+        batch_article_id = articles[0].article_id if len(articles) == 1 else None
+        for article, analysis in zip(articles, self._analyze_raw_texts(raw_texts, batch_article_id)):
+            self._save_artifacts(article, self._tag(article.article_id, analysis))
+
+    def _is_streamed(self, article):
+        """
+        Checks whether an article is too large to be processed as a whole
+        """
+        if not self.options.stream_chunk_size:
+            return False
+        return article.get_raw_text_path().stat().st_size > self.options.stream_chunk_size
+
+    def _process_article_streaming(self, article):
+        """
+        Analyzes a raw text chunk by chunk and appends each chunk to the artifacts right away,
+        so that only one chunk of the text and its tokens are kept in memory
+        """
+        kinds = (ArtifactType.cleaned, ArtifactType.single_tagged, ArtifactType.multiple_tagged)
+        with ExitStack() as stack:
+            raw_file = stack.enter_context(open(article.get_raw_text_path(), encoding='utf-8'))
+            artifact_files = [stack.enter_context(open(article.get_file_path(kind), 'w', encoding='utf-8'))
+                              for kind in kinds]
+
+            is_first_chunk = True
+            for chunk in self._read_chunks(article.article_id, raw_file):
+                analysis = self._analyze_raw_texts([chunk], article.article_id)[0]
+                token_table = self._tag(article.article_id, analysis)
+                if not token_table:
+                    continue
+
+                renderings = self._render(article.article_id, token_table)
+                with self.timer.measure('write', article.article_id) as measurement:
+                    for artifact_file, rendering in zip(artifact_files, renderings):
+                        if not is_first_chunk:
+                            artifact_file.write(' ')
+                        artifact_file.write(rendering)
+                        measurement.size += len(rendering.encode('utf-8'))
+                is_first_chunk = False
+
+    def _read_chunks(self, article_id, raw_file):
+        """
+        Yields chunks of a raw text file, timing the reading
+        """
+        chunks = iter_text_chunks(raw_file, self.options.stream_chunk_size)
+        while True:
+            with self.timer.measure('read', article_id) as measurement:
+                chunk = next(chunks, None)
+                measurement.size = len(chunk.encode('utf-8')) if chunk else 0
+            if chunk is None:
+                return
+            yield chunk
+
+    def _save_artifacts(self, article, token_table):
+        """
+        Saves cleaned, single-tagged and multiple-tagged versions of an article
+        """
+        renderings = self._render(article.article_id, token_table)
+        kinds = (ArtifactType.cleaned, ArtifactType.single_tagged, ArtifactType.multiple_tagged)
+        with self.timer.measure('write', article.article_id, tokens=len(token_table)) as measurement:
+            for rendering, kind in zip(renderings, kinds):
+                article.save_as(rendering, kind)
+                measurement.size += article.get_file_path(kind).stat().st_size
+
+    def _render(self, article_id, token_table):
+        """
+        Returns cleaned, single-tagged and multiple-tagged renderings of tokens
+        """
+        with self.timer.measure('render', article_id, tokens=len(token_table)):
+            return (token_table.get_cleaned(), token_table.get_single_tagged(),
+                    token_table.get_multiple_tagged())
+
+    def _tag(self, article_id, analysis):
+        """
+        Builds a TokenTable with pymorphy tags, timing the tagging
+        """
+        with self.timer.measure('pymorphy', article_id) as measurement:
+            token_table = self._build_tokens(analysis)
+            measurement.tokens = len(token_table)
+        return token_table
 
     def _process(self, raw_text: str):
         """
-        Processes each token and creates MorphToken class instance
+        Processes each token and returns them as a TokenTable
+        """
+        return self._tag(None, self._analyze_raw_texts([raw_text])[0])
+
+    @staticmethod
+    def _prepare_text(raw_text: str):
+        """
+        Glues hyphenated words and puts the whole text on a single line
         """
         # txt from pdf comes with words like след-ующий
         # this replace deals with them
-        text = raw_text.replace('-\n', '').replace('\n', ' ')
-        result = Mystem().analyze(text)
-        # launching morph_tokens list which then is appended with MorphologicalToken class instances
-        morph_tokens = []
+        return raw_text.replace('-\n', '').replace('\n', ' ')
+
+    @classmethod
+    def _split_paragraphs(cls, raw_text: str):
+        """
+        Splits a raw text on empty lines into prepared paragraphs with collapsed whitespace,
+        so that the same paragraph always gets the same Mystem cache key
+        """
+        paragraphs = (' '.join(cls._prepare_text(paragraph).split())
+                      for paragraph in PARAGRAPH_SEPARATOR.split(raw_text))
+        return [paragraph for paragraph in paragraphs if paragraph]
+
+    def _analyze_raw_texts(self, raw_texts, article_id=None):
+        """
+        Returns Mystem analysis of each raw text, consulting the Mystem cache
+        paragraph by paragraph if it is set.
+        Stages are timed as a part of article_id if the texts belong to a single article.
+        """
+        mystem_cache = self.resources.mystem_cache
+        if mystem_cache is None:
+            with self.timer.measure('dehyphenation', article_id):
+                texts = [self._prepare_text(raw_text) for raw_text in raw_texts]
+            return self._analyze_many(texts, article_id)
+
+        with self.timer.measure('dehyphenation', article_id):
+            paragraphs_of_texts = [self._split_paragraphs(raw_text) for raw_text in raw_texts]
+
+        analyses = {}
+        missing = []
+        with self.timer.measure('mystem_cache', article_id):
+            for paragraph in chain.from_iterable(paragraphs_of_texts):
+                if paragraph in analyses:
+                    continue
+                analyses[paragraph] = mystem_cache.get(paragraph)
+                if analyses[paragraph] is None:
+                    missing.append(paragraph)
+
+        # paragraphs missing from the cache are still sent to Mystem together
+        if missing:
+            missing_analyses = self._analyze_many(missing, article_id)
+            with self.timer.measure('mystem_cache', article_id):
+                for paragraph, analysis in zip(missing, missing_analyses):
+                    mystem_cache.put(paragraph, analysis)
+                    analyses[paragraph] = analysis
+
+        # one transaction per call instead of one per paragraph
+        with self.timer.measure('mystem_cache', article_id):
+            mystem_cache.commit()
+
+        return [list(chain.from_iterable(analyses[paragraph] for paragraph in paragraphs))
+                for paragraphs in paragraphs_of_texts]
+
+    def _analyze_many(self, texts, article_id=None):
+        """
+        Sends several texts to Mystem in one request separated by BATCH_SEPARATOR
+        and returns the analysis of each text separately
+        """
+        size = sum(len(text.encode('utf-8')) for text in texts)
+        with self.timer.measure('mystem', article_id, size=size) as measurement:
+            if len(texts) == 1:
+                with self._get_mystem_pool().checkout() as mystem:
+                    analyses = [mystem.analyze(texts[0])]
+            else:
+                # a separator inside a text itself would break the split
+                texts = [text.replace(BATCH_MARK, ' ') for text in texts]
+                with self._get_mystem_pool().checkout() as mystem:
+                    result = mystem.analyze(BATCH_SEPARATOR.join(texts))
+                    analyses = _split_batch_analysis(result)
+
+                    # Mystem has tokenized a separator differently, falling back to one request per text
+                    if len(analyses) != len(texts):
+                        analyses = [mystem.analyze(text) for text in texts]
+
+            measurement.tokens = sum(len(analysis) for analysis in analyses)
+        return analyses
+
+    def _get_mystem_pool(self):
+        """
+        Returns the shared Mystem pool or the own one, which is created on first use,
+        so that _process works without run() as well
+        """
+        if self.resources.mystem_pool is not None:
+            return self.resources.mystem_pool
+        if self._own_pool is None:
+            self._own_pool = MystemPool()
+        return self._own_pool
+
+    def _build_tokens(self, result):
+        """
+        Fills a TokenTable from Mystem analysis
+        """
+        token_table = TokenTable()
+        morph_cache = self.resources.morph_cache or get_parse_cache()
 
-        # pymorphy analyzer which will be used for filling pymorphy tags
-        morph = pymorphy2.MorphAnalyzer()
         for token in result:
 
             # pre requisites for the token to be usable
@@ -146,20 +652,120 @@ class TextProcessingPipeline:
 
             original_word = token["text"]
 
-            morph_token = MorphologicalToken(original_word=original_word)
+            # pymorphy tags, forms tagged beforehand or repeated ones are not parsed again
+            tags_pymorphy = self._form_table.get_tags(original_word)
+            if tags_pymorphy is None:
+                tags_pymorphy, _ = morph_cache.parse(original_word)
+
+            # mystem lemma and tags
+            token_table.append(original_word, token['analysis'][0]['lex'],
+                               token['analysis'][0]['gr'], tags_pymorphy)
+
+        return token_table
+
+
+def iter_text_chunks(file, chunk_size):
+    """
+    Yields pieces of a text file of about chunk_size characters.
+    A piece ends on a paragraph boundary (an empty line) when possible and on a line boundary
+    otherwise, but never after a line ending with a hyphen, so that words broken
+    with '-\\n' always stay within one piece.
+    """
+    chunk = []
+    length = 0
+    for line in file:
+        chunk.append(line)
+        length += len(line)
+        if length < chunk_size or line.rstrip('\n').endswith('-'):
+            continue
+        # cut on an empty line or, if a paragraph is too long, on any line
+        if not line.strip() or length >= 2 * chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+            length = 0
+
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _record_processed(manifest, articles):
+    """
+    Adds successfully processed articles to the manifest, if the run is incremental
+    """
+    if manifest is None:
+        return
+    for article in articles:
+        manifest.record(article)
+
+
+def _tag_forms(forms):
+    """
+    Tags a chunk of distinct word forms with pymorphy,
+    tags are kept as strings to be cheaply sent between processes
+    """
+    analyzer = get_morph_analyzer()
+    parses = {}
+    for form in forms:
+        best_parse = analyzer.parse(form)[0]
+        parses[form] = (str(best_parse.tag), best_parse.normal_form)
+    return parses
+
+
+def _split_batch_analysis(result):
+    """
+    Splits Mystem analysis of texts joined with BATCH_SEPARATOR back into parts
+    """
+    analyses = [[]]
+    # Mystem may glue the separator with neighbouring punctuation or split it
+    # into several non-word tokens, so consecutive non-word tokens are looked at together
+    non_word_text = ''
+    for token in result:
+        if 'analysis' in token:
+            non_word_text = ''
+            analyses[-1].append(token)
+            continue
+
+        non_word_text += token['text']
+        if BATCH_MARK in non_word_text:
+            non_word_text = ''
+            analyses.append([])
+        else:
+            analyses[-1].append(token)
+
+    return analyses
+
 
-            # mystem tags
-            morph_token.normalized_form = token['analysis'][0]['lex']
-            morph_token.tags_mystem = token['analysis'][0]['gr']
+# every worker process keeps its own warm Mystem and MorphAnalyzer between articles,
+# the mystem subprocess exits on its own once the worker closes its stdin
+_WORKER_PIPELINE = None
 
-            # pymorphy tags
 
-            one_word = morph.parse(original_word)[0]
-            morph_token.tags_pymorphy = one_word.tag
+def _init_worker_pipeline(form_table, stream_chunk_size, mystem_cache_params):
+    """
+    Prepares analyzers of a worker process
+    """
+    global _WORKER_PIPELINE  # pylint: disable=global-statement
+    # sqlite connections cannot be shared between processes, every worker opens its own
+    mystem_cache = MystemResultCache(*mystem_cache_params) if mystem_cache_params else None
+    _WORKER_PIPELINE = TextProcessingPipeline(corpus_manager=None,
+                                              options=PipelineOptions(stream_chunk_size=stream_chunk_size),
+                                              resources=PipelineResources(mystem_cache=mystem_cache,
+                                                                          mystem_pool=MystemPool(size=1)))
+    _WORKER_PIPELINE._form_table = FormTable(form_table)  # pylint: disable=protected-access
 
-            morph_tokens.append(morph_token)
 
-        return morph_tokens
+def _process_batch_in_worker(articles):
+    """
+    Processes a batch of articles inside a worker process, returns ids of the articles,
+    the number of tokens taken from the form table and stage timings
+    """
+    # pylint: disable=protected-access
+    hits_before = _WORKER_PIPELINE._form_table.hits
+    # the parent process merges timings of every batch into its own timer
+    _WORKER_PIPELINE.resources.timer = StageTimer()
+    _WORKER_PIPELINE._process_batch(articles)
+    return ([article.article_id for article in articles], _WORKER_PIPELINE._form_table.hits - hits_before,
+            _WORKER_PIPELINE.timer.get_state())
 
 
 def validate_dataset(path_to_validate):
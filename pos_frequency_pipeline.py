@@ -6,6 +6,7 @@ import re
 
 from constants import ASSETS_PATH
 from core_utils.article import ArtifactType
+from core_utils.timing import StageTimer
 from core_utils.visualizer import visualize
 from pipeline import CorpusManager, validate_dataset
 
@@ -23,26 +24,41 @@ class IncorrectFormatError(Exception):
 
 
 class POSFrequencyPipeline:
-    def __init__(self, corpus_manager: CorpusManager):
+    def __init__(self, corpus_manager: CorpusManager, timer: StageTimer = None):
         self.corpus_manager = corpus_manager
+        # time spent in every stage, get_report() or dump() it after the run
+        self.timer = timer or StageTimer()
 
     def run(self):
         """
         Running the pipeline scenario
         """
+        with self.timer.measure('run'):
+            for article in self.corpus_manager.get_articles().values():
+                self._process_article(article)
 
-        for article in self.corpus_manager.get_articles().values():
-            # get the file to take the pos tags from
-            with open(article.get_file_path(ArtifactType.single_tagged), encoding="utf-8") as st_file:
+    def _process_article(self, article):
+        """
+        Calculates frequencies of a single article, saves and visualises them
+        """
+        article_id = article.article_id
+
+        # get the file to take the pos tags from
+        with self.timer.measure('read', article_id) as measurement:
+            single_tagged_path = article.get_file_path(ArtifactType.single_tagged)
+            with open(single_tagged_path, encoding="utf-8") as st_file:
                 morph_text = st_file.read()
+            measurement.size = single_tagged_path.stat().st_size
 
-            validate_input(morph_text)
+        validate_input(morph_text)
+        with self.timer.measure('frequencies', article_id, size=measurement.size):
             freqs = self._generate_freqs_pos(morph_text)
 
             # TASK
             freqs_cases = self._generate_freqs_n_cases(morph_text)
 
-            # save calculated freqs to meta file
+        # save calculated freqs to meta file
+        with self.timer.measure('meta', article_id):
             with open(ASSETS_PATH / article.get_meta_file_path(), encoding="utf-8") as m_file:
                 meta_info = json.load(m_file)
 
@@ -51,9 +67,10 @@ class POSFrequencyPipeline:
             with open(ASSETS_PATH / article.get_meta_file_path(), "w", encoding="utf-8") as m_file:
                 json.dump(meta_info, m_file, indent=4, ensure_ascii=False, separators=(',', ':'))
 
-            # visualise results
-            visualize(statistics=freqs, path_to_save=ASSETS_PATH / f"{article.article_id}_image.png")
-            visualize(statistics=freqs_cases, path_to_save=ASSETS_PATH / f"{article.article_id}_case_image.png")
+        # visualise results
+        with self.timer.measure('visualize', article_id):
+            visualize(statistics=freqs, path_to_save=ASSETS_PATH / f"{article_id}_image.png")
+            visualize(statistics=freqs_cases, path_to_save=ASSETS_PATH / f"{article_id}_case_image.png")
 
     def _generate_freqs_pos(self, text):
 
@@ -2,19 +2,53 @@
 Scrapper implementation
 """
 
+import argparse
+import asyncio
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from html import unescape
+import importlib.util
 import json
 import pathlib
-import random
 import re
-import time
 import shutil
+import time
+from urllib.parse import urlparse
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import requests
 
-from constants import ASSETS_PATH, CRAWLER_CONFIG_PATH, DOMAIN, HEADERS
+from constants import (ASSETS_PATH, CRAWL_JOURNAL_PATH, CRAWL_QUEUE_PATH, CRAWLER_CONFIG_PATH, DOMAIN,
+                       HTTP_CACHE_PATH, RESPONSE_ARCHIVE_PATH)
 from core_utils.article import Article, date_from_meta
-from core_utils.pdf_utils import PDFRawFile
+from core_utils.crawl_journal import CrawlJournal
+from core_utils.frontier import CrawlFrontier, URLSet
+from core_utils.http_cache import HTTPCache
+from core_utils.http_client import HostPolicy, HTTPClient, get_default_client
+from core_utils.pdf_utils import get_downloader, PDFRawFile, PDFStorage
+from core_utils.rate_limiter import DEFAULT_RATE, HostRateLimiter
+from core_utils.response_archive import ArchiveClient, ResponseArchive
+from core_utils.work_queue import SQLiteWorkQueue
+
+# number of articles fetched, parsed and saved at the same time
+DEFAULT_SCRAPE_WORKERS = 4
+MAX_ARTICLES = 100
+# following pagination is opted in with the follow_pagination config key, it lifts the limit
+MAX_FRONTIER_ARTICLES = 100_000
+# listing pages of a frontier crawl fetched at the same time
+FRONTIER_BATCH_SIZE = 50
+# seconds a queue worker waits for items leased by other workers to be finished or to become visible again
+QUEUE_POLL_INTERVAL = 5.0
+# lxml builds a tree several times faster than the pure Python parser, so targeted parsing uses it if installed
+FAST_HTML_BACKEND = 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+# targeted parsing keeps only the elements Crawler and HTMLParser read
+SEED_PAGE_STRAINER = SoupStrainer('a', class_='article__title')
+FRONTIER_PAGE_STRAINER = SoupStrainer('a', href=True)
+ARTICLE_PAGE_STRAINER = SoupStrainer(['a', 'h3'], class_=re.compile(r'\barticle(__title|__author|-panel__item)\b'))
+ISSUE_DATE_PATTERN = re.compile(r"(\d{4}) Выпуск №(\d+)")
+TAG_PATTERN = re.compile(r'<[^>]*>')
 
 
 class IncorrectURLError(Exception):
@@ -39,24 +73,78 @@ class NotEnoughArticlesCollected(Exception):
     pass
 
 
+@dataclass
+class ScrapeOptions:
+    """
+    Settings shared by Crawler, HTMLParser and the functions scraping articles,
+    defaults parse whole pages and do not journal the crawl
+    """
+
+    # seed pages and articles processed before a restart are taken from the journal
+    journal: CrawlJournal = None
+    # only the elements Crawler and HTMLParser read are parsed, by the fastest backend installed
+    targeted_parsing: bool = False
+    # PDFs are downloaded to disk, so that an interrupted download is resumed,
+    # without it they are read from memory and never saved, e.g. on a small disk
+    keep_pdf: bool = True
+
+
+class AsyncHostScheduler:
+    """
+    Lets at most concurrency_per_host requests to one host run at the same time
+    and keeps at least politeness_delay seconds between starts of requests to a host
+    """
+
+    def __init__(self, concurrency_per_host: int = 2, politeness_delay: float = 0.0):
+        self.concurrency_per_host = concurrency_per_host
+        self.politeness_delay = politeness_delay
+        self._semaphores = {}
+        self._locks = {}
+        self._next_start = {}
+
+    @asynccontextmanager
+    async def slot(self, url):
+        """
+        Waits until a request to the url's host is allowed to start
+        """
+        host = urlparse(url).netloc
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.concurrency_per_host))
+        lock = self._locks.setdefault(host, asyncio.Lock())
+
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            async with lock:
+                delay = self._next_start.get(host, 0) - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._next_start[host] = loop.time() + self.politeness_delay
+            yield
+
+
 class Crawler:
     """
     Crawler implementation
     """
 
-    def __init__(self, seed_urls, max_articles: int):
+    def __init__(self, seed_urls, max_articles: int, http_client: HTTPClient = None,
+                 options: ScrapeOptions = None):
         self.seed_urls = seed_urls
         self.max_articles = max_articles
+        self.http_client = http_client or get_default_client()
+        self.options = options or ScrapeOptions()
         self.urls = []
         self.collected_article_urls = 0
+        # an article listed on several pages or linked in different forms is collected once
+        self._seen_article_urls = URLSet()
 
     def _extract_url(self, article_bs):
         """
         get link to the article
         """
         for article_link in article_bs.find_all("a", class_="article__title"):
-            if self.collected_article_urls < self.max_articles:
-                self.urls.append(DOMAIN + article_link["href"])
+            article_url = DOMAIN + article_link["href"]
+            if self.collected_article_urls < self.max_articles and self._seen_article_urls.add(article_url):
+                self.urls.append(article_url)
                 self.collected_article_urls += 1
 
     def find_articles(self):
@@ -65,16 +153,100 @@ class Crawler:
         """
 
         for seed_url in self.seed_urls:
-            response = requests.get(seed_url, headers=HEADERS)
-            sleep_period = random.randrange(1, 3)
-            time.sleep(sleep_period)
-
-            if not response.ok:
-                print("Request was unsuccessful.")
+            if self._restore_seed(seed_url):
                 continue
 
-            seed_bs = BeautifulSoup(response.text, features="html.parser")
-            self._extract_url(seed_bs)
+            # the client's rate limiter keeps the pause between requests to the site
+            response = self.http_client.get(seed_url)
+            self._add_seed_page(seed_url, response)
+
+    def find_articles_concurrently(self, concurrency_per_host: int = 2, politeness_delay: float = 0.0):
+        """
+        Finds articles fetching seed pages concurrently,
+        links are collected in the order of seed_urls as in find_articles
+        """
+        scheduler = AsyncHostScheduler(concurrency_per_host, politeness_delay)
+        seeds_to_fetch = [seed_url for seed_url in self.seed_urls
+                          if self.options.journal is None or seed_url not in self.options.journal.seed_urls]
+        responses = dict(zip(seeds_to_fetch, asyncio.run(self._fetch_seed_pages(scheduler, seeds_to_fetch))))
+
+        for seed_url in self.seed_urls:
+            if not self._restore_seed(seed_url):
+                self._add_seed_page(seed_url, responses[seed_url])
+
+    def find_articles_in_frontier(self, max_pages: int = None, concurrency_per_host: int = 2,
+                                  politeness_delay: float = 0.0):
+        """
+        Finds articles walking listing pages breadth-first from the seed urls:
+        issues, archive pages and their pagination found on the way.
+        Pages are fetched concurrently in batches, links are collected in the order the pages were queued.
+        """
+        frontier = CrawlFrontier(self.seed_urls)
+        visited_pages = 0
+
+        while self.collected_article_urls < self.max_articles:
+            limit = FRONTIER_BATCH_SIZE if max_pages is None else min(FRONTIER_BATCH_SIZE, max_pages - visited_pages)
+            batch = frontier.pop_level(limit)
+            if not batch:
+                break
+            visited_pages += len(batch)
+
+            # asyncio primitives are bound to a loop, so every batch gets its own scheduler
+            scheduler = AsyncHostScheduler(concurrency_per_host, politeness_delay)
+            pages_to_fetch = [page_url for page_url in batch
+                              if self.options.journal is None or page_url not in self.options.journal.seed_urls]
+            responses = dict(zip(pages_to_fetch, asyncio.run(self._fetch_seed_pages(scheduler, pages_to_fetch))))
+
+            for page_url in batch:
+                if self._restore_seed(page_url):
+                    page_links = self.options.journal.page_links.get(page_url, [])
+                else:
+                    page_links = self._add_seed_page(page_url, responses[page_url], follow_links=True)
+                frontier.add_links(page_url, page_links)
+
+    async def _fetch_seed_pages(self, scheduler, seed_urls):
+        """
+        Fetches seed pages, requests library is blocking so it runs in threads
+        """
+        async def fetch(seed_url):
+            async with scheduler.slot(seed_url):
+                return await asyncio.to_thread(self.http_client.get, seed_url)
+
+        return await asyncio.gather(*(fetch(seed_url) for seed_url in seed_urls))
+
+    def _add_seed_page(self, seed_url, response, follow_links: bool = False):
+        """
+        Collects article links from a fetched seed page and journals them,
+        with follow_links returns all links of the page for the frontier
+        """
+        # transient failures have been retried by the client, the page is skipped
+        if not response.ok:
+            print(f"Request to {seed_url} was unsuccessful: {response.status_code}.")
+            return []
+
+        collected_before = len(self.urls)
+        strainer = FRONTIER_PAGE_STRAINER if follow_links else SEED_PAGE_STRAINER
+        seed_bs = make_soup(response.text, strainer if self.options.targeted_parsing else None)
+        self._extract_url(seed_bs)
+        page_links = [link["href"] for link in seed_bs.find_all("a", href=True)] if follow_links else None
+
+        if self.options.journal is not None:
+            self.options.journal.record_seed(seed_url, self.urls[collected_before:], page_links)
+        return page_links or []
+
+    def _restore_seed(self, seed_url):
+        """
+        Takes article links of a seed page processed before a restart from the journal
+        """
+        if self.options.journal is None or seed_url not in self.options.journal.seed_urls:
+            return False
+
+        article_urls = self.options.journal.seed_urls[seed_url]
+        self.urls.extend(article_urls)
+        self.collected_article_urls += len(article_urls)
+        for article_url in article_urls:
+            self._seen_article_urls.add(article_url)
+        return True
 
     def get_search_urls(self):
         """
@@ -83,13 +255,34 @@ class Crawler:
         return self.seed_urls
 
 
-def prepare_environment(base_path):
+def make_soup(markup: str, parse_only: SoupStrainer = None):
+    """
+    Builds a tree of a page, with parse_only the tree is restricted to the matching elements
+    and is built by the fastest backend installed
+    """
+    if parse_only is None:
+        return BeautifulSoup(markup, 'html.parser')
+    return BeautifulSoup(markup, FAST_HTML_BACKEND, parse_only=parse_only)
+
+
+def get_page_text(markup: str):
+    """
+    Returns text of a page without building its tree
+    """
+    return unescape(TAG_PATTERN.sub('', markup))
+
+
+def prepare_environment(base_path, keep_existing: bool = False):
     """
-    Creates ASSETS_PATH folder if not created and removes existing folder
+    Creates ASSETS_PATH folder if not created and removes existing folder,
+    an existing folder is kept when a crawl is resumed
     """
 
     path = pathlib.Path(base_path)
 
+    if path.exists() and keep_existing:
+        return
+
     if path.exists():
         shutil.rmtree(path)
 
@@ -119,7 +312,7 @@ def validate_config(crawler_path):
     if not isinstance(articles, int) or articles <= 0:
         raise IncorrectNumberOfArticlesError
 
-    if articles > 100:
+    if articles > (MAX_FRONTIER_ARTICLES if config.get('follow_pagination') is True else MAX_ARTICLES):
         raise NumberOfArticlesOutOfRangeError
 
     for url in urls:
@@ -131,25 +324,43 @@ def validate_config(crawler_path):
     return urls, articles
 
 
+def is_frontier_crawl(crawler_path):
+    """
+    Checks whether the config asks to follow pagination from the seed urls
+    """
+    with open(crawler_path, encoding='utf-8') as file:
+        return json.load(file).get('follow_pagination') is True
+
+
 class HTMLParser:
 
-    def __init__(self, article_url, article_id):
+    def __init__(self, article_url, article_id, http_client: HTTPClient = None, options: ScrapeOptions = None):
         """
         Init
         """
         self.article_url = article_url
         self.article_id = article_id
         self.article = Article(url=article_url, article_id=article_id)
+        self.http_client = http_client or get_default_client()
+        self.options = options or ScrapeOptions()
 
     def parse(self):
         """
         filling the class Article instance
         """
-        response = requests.get(self.article_url, HEADERS)
-        article_bs = BeautifulSoup(response.text, 'html.parser')
+        response = self.http_client.get(self.article_url)
+        response.raise_for_status()
+
+        if self.options.targeted_parsing:
+            # the issue date is searched in the page text, the strained tree does not contain it
+            article_bs = make_soup(response.text, ARTICLE_PAGE_STRAINER)
+            page_text = get_page_text(response.text)
+        else:
+            article_bs = make_soup(response.text)
+            page_text = article_bs.text
 
         self._fill_article_with_text(article_bs)
-        self._fill_article_with_meta_information(article_bs)
+        self._fill_article_with_meta_information(article_bs, page_text)
 
         return self.article
 
@@ -163,12 +374,18 @@ class HTMLParser:
 
             if ".pdf" in pdf["href"]:
 
-                pdf_raw = PDFRawFile(DOMAIN + pdf["href"], self.article_id)
+                storage = PDFStorage.disk if self.options.keep_pdf else PDFStorage.memory_only
+                pdf_raw = PDFRawFile(DOMAIN + pdf["href"], self.article_id, get_downloader(self.http_client),
+                                     storage)
 
                 pdf_raw.download()
-                pdf_text = pdf_raw.get_text()
 
                 splitters = ["Список литературы", "Список источников и литературы"]
+                # pages after the bibliography heading contain no splitter,
+                # so splitting the text up to its page gives the same result as splitting the whole text
+                pdf_text = pdf_raw.get_text_up_to(splitters)
+                if pdf_text is None:
+                    continue
 
                 for splitter in splitters:
                     if splitter in pdf_text:
@@ -177,7 +394,7 @@ class HTMLParser:
 
                         break
 
-    def _fill_article_with_meta_information(self, article_bs):
+    def _fill_article_with_meta_information(self, article_bs, page_text: str = None):
         """
         Add meta information to Article class instance
         """
@@ -187,7 +404,7 @@ class HTMLParser:
         author = article_bs.find("a", class_="link link_const article__author")
         self.article.author = author.text
 
-        date_raw = re.search(r"(\d{4}) Выпуск №(\d+)", article_bs.text)
+        date_raw = ISSUE_DATE_PATTERN.search(article_bs.text if page_text is None else page_text)
         # Only year is available, the № of issues per year doesn't correspond with months
         # The year is divided into 4 parts then
         # The time is fixed 00:00:00
@@ -200,21 +417,216 @@ class HTMLParser:
         self.article.date = date_from_meta(date_no_t + time_default)
 
 
+def scrape_articles(article_urls, http_client: HTTPClient = None, workers: int = DEFAULT_SCRAPE_WORKERS,
+                    options: ScrapeOptions = None):
+    """
+    Parses and saves articles in a pool of threads,
+    ids follow the order of article_urls starting from 1 whatever order articles finish in.
+    Articles the journal has recorded as saved are loaded from disk instead.
+    """
+    options = options or ScrapeOptions()
+    journal = options.journal
+
+    def scrape(article_id, article_url):
+        if _is_article_saved(journal, article_id, article_url):
+            return Article(url=article_url, article_id=article_id)
+
+        parser = HTMLParser(article_url, article_id, http_client, options)
+        article = parser.parse()
+        article.save_raw()
+
+        if journal is not None:
+            journal.record_article(article_id, article_url)
+        return article
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(scrape, article_id, article_url)
+                   for article_id, article_url in enumerate(article_urls, start=1)]
+        return [future.result() for future in futures]
+
+
+def scrape_from_queue(queue: SQLiteWorkQueue, http_client: HTTPClient = None, options: ScrapeOptions = None):
+    """
+    Parses and saves articles leased from a shared queue until every item is done or failed,
+    an article that has failed to be scraped is released for another attempt.
+    Returns the number of articles saved by this worker.
+    """
+    saved = 0
+    while True:
+        item = queue.lease()
+        if item is None:
+            if queue.is_finished():
+                return saved
+            time.sleep(QUEUE_POLL_INTERVAL)
+            continue
+
+        article_id, article_url = item
+        try:
+            # a large PDF may take longer than the lease
+            with queue.keep_leased(article_id):
+                article = HTMLParser(article_url, article_id, http_client, options).parse()
+                article.save_raw()
+        except Exception as error:  # pylint: disable=broad-except
+            # a broken page or PDF must not stop the worker, the item is retried up to the queue's limit
+            queue.release(article_id, repr(error))
+            continue
+
+        queue.complete(article_id)
+        saved += 1
+
+
+def scrape_in_processes(article_urls, processes: int, queue_path=CRAWL_QUEUE_PATH, keep_done: bool = False,
+                        keep_pdf: bool = True):
+    """
+    Parses and saves articles in worker processes sharing a queue,
+    ids follow the order of article_urls starting from 1.
+    With keep_done, items done by an interrupted crawl are not scraped again.
+    Returns the numbers of items by status and network counters summed over the workers.
+    """
+    queue = SQLiteWorkQueue(queue_path)
+    if not keep_done:
+        queue.reset()
+    queue.put_many(enumerate(article_urls, start=1))
+
+    network_stats = Counter()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(_run_queue_worker, queue_path, processes, keep_pdf) for _ in range(processes)]
+        for future in futures:
+            network_stats.update(future.result())
+    # speeds of the workers are not summed up, the average speed is computed over all their downloads
+    if network_stats['download_seconds']:
+        network_stats['bytes_per_second'] = network_stats['bytes_downloaded'] / network_stats['download_seconds']
+
+    counts = queue.get_counts()
+    queue.close()
+    return counts, dict(network_stats)
+
+
+def _run_queue_worker(queue_path, processes: int, keep_pdf: bool = True):
+    """
+    Scrapes articles from the shared queue in a worker process,
+    the workers share the request rate allowed for the site.
+    Returns the worker's network counters and the number of articles it has saved.
+    """
+    queue = SQLiteWorkQueue(queue_path)
+    http_client = HTTPClient(policy=HostPolicy(rate_limiter=HostRateLimiter(rate=DEFAULT_RATE / processes)),
+                             cache=HTTPCache(HTTP_CACHE_PATH))
+    with http_client:
+        saved = scrape_from_queue(queue, http_client, ScrapeOptions(targeted_parsing=True, keep_pdf=keep_pdf))
+    queue.close()
+    return {**http_client.get_stats(), **get_downloader(http_client).get_stats(), 'saved': saved}
+
+
+def _is_article_saved(journal, article_id, article_url):
+    """
+    Checks whether an article has been saved by a previous run of the same crawl
+    """
+    if journal is None or journal.completed_articles.get(article_id) != article_url:
+        return False
+    return Article(url=article_url, article_id=article_id).get_raw_text_path().exists()
+
+
+def reparse_archive(seed_urls, max_articles: int, archive_path=RESPONSE_ARCHIVE_PATH,
+                    follow_pagination: bool = False):
+    """
+    Re-derives raw texts and meta information from the archive of a previous crawl without network traffic.
+    Seed pages are read from the archive as well, so articles get the same ids as in the crawl.
+    An article whose page or PDF is missing in the archive is skipped, its id is left out of the dataset.
+    Returns numbers of responses served from the archive and missing in it and ids of skipped articles.
+    """
+    prepare_environment(ASSETS_PATH)
+    with ArchiveClient(ResponseArchive(archive_path)) as archive_client:
+        options = ScrapeOptions(targeted_parsing=True)
+        archive_crawler = Crawler(seed_urls, max_articles, archive_client, options)
+        if follow_pagination:
+            archive_crawler.find_articles_in_frontier()
+        else:
+            archive_crawler.find_articles()
+
+        def reparse(article_id, article_url):
+            try:
+                HTMLParser(article_url, article_id, archive_client, options).parse().save_raw()
+            except requests.HTTPError:
+                # the archive answers 404 for a response it does not have
+                return False
+            return True
+
+        with ThreadPoolExecutor(max_workers=DEFAULT_SCRAPE_WORKERS) as executor:
+            article_ids = range(1, len(archive_crawler.urls) + 1)
+            reparsed = executor.map(reparse, article_ids, archive_crawler.urls)
+            skipped = [article_id for article_id, saved in zip(article_ids, reparsed) if not saved]
+        return {**archive_client.get_stats(), 'skipped_articles': skipped}
+
+
+def parse_arguments():
+    """
+    Parses command line arguments of the scrapper
+    """
+    parser = argparse.ArgumentParser(description='Crawls articles and saves their texts and meta information')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Number of worker processes scraping articles from a shared queue')
+    parser.add_argument('--archive', action='store_true',
+                        help='Append every fetched page and PDF to the response archive')
+    parser.add_argument('--reparse', action='store_true',
+                        help='Parse articles from the response archive of a previous crawl instead of the site')
+    parser.add_argument('--no-keep-pdf', dest='keep_pdf', action='store_false',
+                        help='Extract texts from downloaded PDFs without saving the PDFs to disk')
+    arguments_ = parser.parse_args()
+    # the archive is appended by one process only
+    if arguments_.archive and arguments_.processes > 1:
+        parser.error('--archive cannot be combined with --processes')
+    return arguments_
+
+
 if __name__ == '__main__':
+    arguments = parse_arguments()
+
     # checking the environment
     s_urls, all_articles = validate_config(CRAWLER_CONFIG_PATH)
-    prepare_environment(ASSETS_PATH)
+
+    if arguments.reparse:
+        archive_stats = reparse_archive(s_urls, all_articles, follow_pagination=is_frontier_crawl(CRAWLER_CONFIG_PATH))
+        print(f'Archive: {archive_stats}')
+        # the pipeline does not accept a dataset with gaps in its numbering
+        if archive_stats['skipped_articles']:
+            raise SystemExit(f'Articles {archive_stats["skipped_articles"]} are missing in the archive, '
+                             f'the dataset is incomplete')
+        raise SystemExit
+
+    # a crawl interrupted with the same config continues from its checkpoint
+    follow_pages = is_frontier_crawl(CRAWLER_CONFIG_PATH)
+    crawl_journal = CrawlJournal(CRAWL_JOURNAL_PATH)
+    resume = crawl_journal.can_resume(s_urls, all_articles, follow_pages)
+    if not resume:
+        crawl_journal.start(s_urls, all_articles, follow_pages)
+    prepare_environment(ASSETS_PATH, keep_existing=resume)
+
+    # one pooled connection to the journal site is reused by every request,
+    # pages and PDFs unchanged since the previous crawl are taken from the cache
+    client = HTTPClient(cache=HTTPCache(HTTP_CACHE_PATH),
+                        archive=ResponseArchive(RESPONSE_ARCHIVE_PATH) if arguments.archive else None)
 
     # initiating Crawler with PDF class instance and extract article links
-    crawler = Crawler(s_urls, all_articles)
-    crawler.find_articles()
+    scrape_options = ScrapeOptions(journal=crawl_journal, targeted_parsing=True, keep_pdf=arguments.keep_pdf)
+    crawler = Crawler(s_urls, all_articles, client, scrape_options)
+    if follow_pages:
+        crawler.find_articles_in_frontier()
+    else:
+        crawler.find_articles_concurrently()
 
     if crawler.collected_article_urls < crawler.max_articles:
         raise NotEnoughArticlesCollected
 
     # extracting pdf, parsing pdf and saving text from every article link
     # stored in Crawler instance
-    for i, link in enumerate(crawler.urls):
-        parser = HTMLParser(link, i + 1)
-        article = parser.parse()
-        article.save_raw()
+    if arguments.processes > 1:
+        # PDF extraction takes CPU, so articles are shared by processes rather than threads
+        article_counts, worker_stats = scrape_in_processes(crawler.urls, arguments.processes, keep_done=resume,
+                                                           keep_pdf=arguments.keep_pdf)
+        print(f'Articles by status: {article_counts}')
+        print(f'Network of workers: {worker_stats}')
+    else:
+        scrape_articles(crawler.urls, client, options=scrape_options)
+    crawl_journal.record_finished()
+    network = {**client.get_stats(), **get_downloader(client).get_stats()}
+    print(f'Network: {network}')